@@ -0,0 +1,145 @@
+################################################################################
+#
+#   cells.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import array
+import math
+
+#Some notes:
+#   1) A seed's voronoi cell is everywhere that's closer to it than to any
+#      other seed. For each other seed, that's one side of the line halfway
+#      between the two (a "half-plane"), so the cell can be made exactly by
+#      starting with the whole rectangle and cutting away the wrong side of
+#      each of those lines (Sutherland-Hodgman clipping). No corners can be
+#      missed since nothing is ever stepped or searched for.
+#   2) Only nearby seeds can cut a cell. The seeds are put into a grid of
+#      buckets, and the buckets around a seed are checked in rings going
+#      outward. Once the ring is more than twice as far away as the farthest
+#      corner of the cell, nothing farther out can cut it any more (the line
+#      halfway to a seed that far away doesn't reach the cell).
+#   3) Cells are flat arrays of doubles [x1, y1, x2, y2, ..., xn, yn] going
+#      counter-clockwise (the same way the rectangle starts).
+
+class Cell_builder(object):
+    def __init__(self, points, width, height):
+        self.points = [tuple(point) for point in points]
+        self.width = width
+        self.height = height
+
+        #About one seed per bucket.
+        count = max(len(self.points), 1)
+        self.bucket_size = max(math.sqrt(width * height / count), 1)
+        self.columns = int(math.ceil(width / self.bucket_size)) + 1
+        self.rows = int(math.ceil(height / self.bucket_size)) + 1
+        self.buckets = [list() for _ in range(self.columns * self.rows)]
+        for (i, point) in enumerate(self.points):
+            (column, row) = self.get_bucket(point)
+            self.buckets[row * self.columns + column].append(i)
+
+    def get_bucket(self, point):
+        column = min(max(int(point[0] / self.bucket_size), 0), self.columns - 1)
+        row = min(max(int(point[1] / self.bucket_size), 0), self.rows - 1)
+        return (column, row)
+
+    def build_cells(self):
+        return [self.build_cell(i) for i in range(len(self.points))]
+
+    def build_cell(self, i):
+        (x, y) = self.points[i]
+        vertices = array.array("d", [0, 0, self.width, 0,
+                                     self.width, self.height, 0, self.height])
+
+        #Seeds farther than reach can't cut the cell (see note 2).
+        reach = 2 * farthest_distance(vertices, x, y)
+
+        (column, row) = self.get_bucket((x, y))
+        ring = 0
+        while True:
+            for j in self.ring_points(column, row, ring):
+                if j == i:
+                    continue
+                (other_x, other_y) = self.points[j]
+                dx = other_x - x
+                dy = other_y - y
+                distance = dx ** 2 + dy ** 2
+                if distance == 0 or distance >= reach ** 2:
+                    continue #(same spot, there's no line between them)
+
+                #Points closer to this seed: dx * px + dy * py <= limit
+                limit = ((other_x ** 2 + other_y ** 2) - (x ** 2 + y ** 2)) / 2
+                vertices = clip(vertices, dx, dy, limit)
+                reach = 2 * farthest_distance(vertices, x, y)
+
+            #Anything outside this ring is at least ring * bucket_size away.
+            if (ring * self.bucket_size >= reach or
+                ring > max(self.columns, self.rows)):
+                return vertices
+            ring += 1
+
+    def ring_points(self, column, row, ring):
+        #Every seed in the square ring of buckets ring away from (column, row).
+        if ring == 0:
+            return self.buckets[row * self.columns + column]
+
+        points = list()
+        for other_row in range(row - ring, row + ring + 1):
+            if not 0 <= other_row < self.rows:
+                continue
+            start = other_row * self.columns
+            if other_row == row - ring or other_row == row + ring:
+                other_columns = range(column - ring, column + ring + 1)
+            else:
+                other_columns = (column - ring, column + ring)
+            for other_column in other_columns:
+                if 0 <= other_column < self.columns:
+                    points.extend(self.buckets[start + other_column])
+        return points
+
+def clip(vertices, a, b, limit):
+    #Keeps the part of the polygon where a * x + b * y <= limit.
+    clipped = array.array("d")
+    count = len(vertices) // 2
+    if count == 0:
+        return clipped
+
+    x1 = vertices[-2]
+    y1 = vertices[-1]
+    inside1 = a * x1 + b * y1 - limit
+    for k in range(0, count * 2, 2):
+        x2 = vertices[k]
+        y2 = vertices[k + 1]
+        inside2 = a * x2 + b * y2 - limit
+
+        if (inside1 <= 0) != (inside2 <= 0): #crosses the line
+            t = inside1 / (inside1 - inside2)
+            add_vertex(clipped, x1 + (x2 - x1) * t, y1 + (y2 - y1) * t)
+        if inside2 <= 0:
+            add_vertex(clipped, x2, y2)
+
+        (x1, y1, inside1) = (x2, y2, inside2)
+
+    #The last one might be the same as the first.
+    if (len(clipped) > 2 and
+        abs(clipped[0] - clipped[-2]) < 1e-9 and
+        abs(clipped[1] - clipped[-1]) < 1e-9):
+        del clipped[-2:]
+    return clipped
+
+def add_vertex(vertices, x, y):
+    #Doesn't add the same vertex twice in a row (cutting right through a
+    #corner would otherwise give it twice).
+    if (len(vertices) > 0 and
+        abs(vertices[-2] - x) < 1e-9 and abs(vertices[-1] - y) < 1e-9):
+        return
+    vertices.append(x)
+    vertices.append(y)
+
+def farthest_distance(vertices, x, y):
+    farthest = 0
+    for k in range(0, len(vertices), 2):
+        distance = (vertices[k] - x) ** 2 + (vertices[k + 1] - y) ** 2
+        farthest = max(farthest, distance)
+    return math.sqrt(farthest)
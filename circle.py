@@ -6,7 +6,6 @@
 ################################################################################
 
 import math
-import pyglet
 import polygon
 
 class Circle(polygon.Simple_polygon):
@@ -0,0 +1,200 @@
+################################################################################
+#
+#   dcel.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import math
+
+#Some notes:
+#   1) This is a doubly-connected edge list (DCEL, or "half-edge" structure)
+#      for a solved voronoi diagram. Every edge between two cells is split
+#      into two half-edges going opposite ways, one for each cell (twins).
+#      Each cell (face) can walk around its own half-edges, and any half-edge
+#      can hop over to the cell on the other side through its twin, so finding
+#      a cell's neighbours or the edge two cells share never needs a search.
+#   2) Vertices are shared: a corner where three cells meet is one Vertex that
+#      all three cells point to. Cells are made separately (see cells.py), so
+#      corners that are within tolerance of each other are treated as one.
+#   3) Half-edges along the border of the diagram have no twin (None).
+#   4) The Delaunay triangulation is the "dual" of the voronoi diagram: seeds
+#      whose cells share an edge are connected, and every corner where three
+#      (or more) cells meet gives a triangle of their seeds. Since the diagram
+#      is cut off at the border, this is the triangulation of cells that
+#      actually touch inside the map (neighbours only beyond the border don't
+#      count).
+
+class Vertex(object):
+    def __init__(self, point):
+        self.point = point
+        self.half_edges = list() #half-edges starting at this vertex
+
+    def __repr__(self):
+        return f"Vertex at {self.point}"
+
+    def faces(self):
+        #Every cell that has this vertex as a corner.
+        return [half_edge.face for half_edge in self.half_edges]
+
+class Half_edge(object):
+    def __init__(self, origin, face):
+        self.origin = origin #vertex it starts at
+        self.face = face #cell it goes around (counter-clockwise)
+        self.twin = None
+        self.next = None
+        self.prev = None
+
+    def __repr__(self):
+        return f"Half_edge {self.origin.point} -> {self.destination.point}"
+
+    @property
+    def destination(self):
+        return self.next.origin
+
+    def neighbour(self):
+        #The cell on the other side (None along the border).
+        if self.twin == None:
+            return None
+        return self.twin.face
+
+class Face(object):
+    def __init__(self, index, site):
+        self.index = index #same as the seed's index in the diagram
+        self.site = site
+        self.half_edge = None #any one of its half-edges
+
+    def __repr__(self):
+        return f"Face {self.index} around {self.site}"
+
+    def half_edges(self):
+        #Goes around the cell counter-clockwise.
+        if self.half_edge == None:
+            return
+        half_edge = self.half_edge
+        while True:
+            yield half_edge
+            half_edge = half_edge.next
+            if half_edge is self.half_edge:
+                return
+
+    def neighbours(self):
+        for half_edge in self.half_edges():
+            if half_edge.twin != None:
+                yield half_edge.twin.face
+
+    def vertices(self):
+        for half_edge in self.half_edges():
+            yield half_edge.origin
+
+class Dcel(object):
+    def __init__(self, points, cells, tolerance = 1e-6):
+        #points are the seeds and cells are flat counter-clockwise arrays of
+        #each seed's cell [x1, y1, ..., xn, yn] (see voronoi.build_cells).
+        self.tolerance = tolerance
+        self.vertices = list()
+        self.half_edges = list()
+        self.faces = list()
+        self.vertex_grid = dict() #see get_vertex
+
+        for (index, (point, cell)) in enumerate(zip(points, cells)):
+            self.add_face(index, tuple(point), cell)
+        self.link_twins()
+
+    def get_vertex(self, x, y):
+        #Returns the vertex at (x, y), making it if it doesn't exist yet.
+        #Vertices are kept in a grid of tolerance-sized squares, and the
+        #squares around it are checked too in case it's right on a line.
+        column = math.floor(x / self.tolerance)
+        row = math.floor(y / self.tolerance)
+        for other_column in (column - 1, column, column + 1):
+            for other_row in (row - 1, row, row + 1):
+                for vertex in self.vertex_grid.get((other_column, other_row),
+                                                   ()):
+                    (vertex_x, vertex_y) = vertex.point
+                    if (abs(vertex_x - x) <= self.tolerance and
+                        abs(vertex_y - y) <= self.tolerance):
+                        return vertex
+
+        vertex = Vertex((x, y))
+        self.vertices.append(vertex)
+        self.vertex_grid.setdefault((column, row), list()).append(vertex)
+        return vertex
+
+    def add_face(self, index, site, cell):
+        face = Face(index, site)
+        self.faces.append(face)
+
+        corners = list()
+        for k in range(0, len(cell), 2):
+            vertex = self.get_vertex(cell[k], cell[k + 1])
+            if len(corners) == 0 or vertex is not corners[-1]:
+                corners.append(vertex)
+        if len(corners) > 1 and corners[0] is corners[-1]:
+            corners.pop()
+        if len(corners) < 3: #not really a cell (seeds on top of each other)
+            return
+
+        half_edges = list()
+        for vertex in corners:
+            half_edge = Half_edge(vertex, face)
+            vertex.half_edges.append(half_edge)
+            half_edges.append(half_edge)
+        for (i, half_edge) in enumerate(half_edges):
+            half_edge.next = half_edges[(i + 1) % len(half_edges)]
+            half_edge.prev = half_edges[i - 1]
+
+        face.half_edge = half_edges[0]
+        self.half_edges.extend(half_edges)
+
+    def link_twins(self):
+        #Twins go between the same two vertices in opposite directions.
+        by_vertices = dict()
+        for half_edge in self.half_edges:
+            by_vertices[(id(half_edge.origin), id(half_edge.destination))] = (
+                                                                    half_edge)
+        for half_edge in self.half_edges:
+            key = (id(half_edge.destination), id(half_edge.origin))
+            half_edge.twin = by_vertices.get(key)
+
+    def neighbours(self, index):
+        #Indices of the cells that share an edge with cell index.
+        return [face.index for face in self.faces[index].neighbours()]
+
+    def shared_edge(self, index, other_index):
+        #The half-edge of cell index that borders cell other_index
+        #(its twin goes the other way around other_index), or None.
+        for half_edge in self.faces[index].half_edges():
+            if (half_edge.twin != None and
+                half_edge.twin.face.index == other_index):
+                return half_edge
+        return None
+
+    def delaunay_edges(self):
+        #Pairs of seed indices (i < j) whose cells share an edge.
+        edges = list()
+        for half_edge in self.half_edges:
+            if half_edge.twin != None:
+                (i, j) = (half_edge.face.index, half_edge.twin.face.index)
+                if i < j:
+                    edges.append((i, j))
+        return edges
+
+    def delaunay_triangles(self):
+        #Triples of seed indices (counter-clockwise) for every corner where
+        #three or more cells meet. Four or more (the seeds are on one circle)
+        #get split into a fan of triangles.
+        triangles = list()
+        for vertex in self.vertices:
+            faces = vertex.faces()
+            if len(faces) < 3 or any(half_edge.twin == None
+                                     for half_edge in vertex.half_edges):
+                continue #on the border
+
+            (x, y) = vertex.point
+            faces.sort(key = lambda face: math.atan2(face.site[1] - y,
+                                                     face.site[0] - x))
+            for k in range(1, len(faces) - 1):
+                triangles.append((faces[0].index, faces[k].index,
+                                  faces[k + 1].index))
+        return triangles
@@ -0,0 +1,88 @@
+################################################################################
+#
+#   diagram_cache.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import hashlib
+import json
+import os
+
+#Some notes:
+#   1) This keeps solved voronoi diagrams (the seed points and each seed's
+#      ordered cell) on disk so that a map made with the same settings and rng
+#      seed can skip solving its diagram entirely (see voronoi.py note 7).
+#   2) Each diagram is its own .json file in folder. Reading one "touches" it,
+#      so the file times say which diagrams were used most recently. Once the
+#      files take up more than max_size bytes, the least recently used ones
+#      are deleted until they fit again.
+
+class Diagram_cache(object):
+    def __init__(self, folder, max_size = 50 * 1024 * 1024):
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(self.folder, exist_ok = True)
+
+    def get_file_path(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.folder, name + ".json")
+
+    def get(self, key):
+        #Returns (points, cells) or None if the diagram isn't cached.
+        file_path = self.get_file_path(key)
+        try:
+            with open(file_path) as f:
+                diagram = json.load(f)
+        except (OSError, ValueError): #missing or half-written
+            return None
+
+        if diagram.get("key") != key:
+            return None
+
+        os.utime(file_path) #most recently used now
+        points = [tuple(point) for point in diagram["points"]]
+        cells = [[tuple(point) for point in cell] for cell in diagram["cells"]]
+        return (points, cells)
+
+    def put(self, key, points, cells):
+        diagram = {"key": key,
+                   "points": [list(point) for point in points],
+                   "cells": [[list(point) for point in cell] for cell in cells]}
+
+        #Written to a temporary file first so a reader never sees half of it
+        #(the map farm can have several processes sharing a cache).
+        file_path = self.get_file_path(key)
+        temporary_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(diagram, f)
+        os.replace(temporary_path, file_path)
+
+        self.evict()
+
+    def evict(self):
+        files = list()
+        total_size = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError: #removed by someone else
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        #Oldest (least recently used) first.
+        for (_, size, name) in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+            total_size -= size
+
+def make_key(width, height, number_of_seeds, seed_padding, rng_seed):
+    return (f"{width}x{height}; {number_of_seeds} seeds; "
+            f"{seed_padding} padding; rng seed {rng_seed!r}")
@@ -0,0 +1,461 @@
+################################################################################
+#
+#   fortune.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import heapq
+import math
+import random
+
+#Some notes:
+#   1) This is the event-driven version of Fortune's Algorithm (see the notes
+#      at the top of voronoi.py for links). Instead of nudging the sweepline
+#      up a little at a time and intersecting every pair of parabolas, the
+#      sweepline jumps straight from one event to the next:
+#           -- a site event happens when the sweepline reaches a seed. The arc
+#              above the seed is split and the new seed's arc goes in between.
+#           -- a circle event happens when an arc gets squeezed out of the
+#              beachline by its neighbours. That's exactly where a corner
+#              (vertex) of the diagram is.
+#      Events are kept in a heap and the beachline is kept in a balanced
+#      tree (a treap), so the whole diagram is solved in O(n log n).
+#   2) The sweepline moves UP (increasing y) just like in voronoi.py, so the
+#      parabolas open downward and the beachline is the highest of them.
+#   3) Edges that never get finished (rays) are clipped to the width/height
+#      rectangle at the very end, and the corners of the rectangle are handed
+#      to whichever seed is closest to them.
+
+class Fortune(object):
+    def __init__(self, points, width, height):
+        self.points = points
+        self.width = width
+        self.height = height
+
+        self.sweepline_height = -math.inf
+        self.events = list() #heap of (y, x, count, event)
+        self.event_count = 0 #tie breaker so events are never compared
+        self.beachline = Beachline()
+        self.edges = list()
+
+    def solve(self):
+        for (i, point) in enumerate(self.points):
+            self.push_event(Event(point[1], point[0], i))
+
+        while len(self.events) > 0:
+            (y, x, _, event) = heapq.heappop(self.events)
+            if event.arc == None:
+                self.sweepline_height = y
+                self.handle_site_event(event.index)
+            elif event.valid:
+                self.sweepline_height = y
+                self.handle_circle_event(event)
+
+        self.clip_edges()
+        self.generate_cells()
+
+    def push_event(self, event):
+        self.event_count += 1
+        heapq.heappush(self.events,
+                       (event.y, event.x, self.event_count, event))
+
+    #The following handles the two kinds of events (see note 1 above).
+    ############################################################################
+    def handle_site_event(self, index):
+        site = self.points[index]
+        arc = Arc(index, site, self.beachline.new_priority())
+
+        above = self.beachline.find(site[0], site[1])
+        if above == None: #first seed, nothing to split
+            self.beachline.insert_after(None, arc)
+            return
+
+        if above.site[1] == site[1]:
+            #Both seeds sit on the sweepline (only the lowest row of seeds can
+            #do this) so their arcs are just vertical rays. There's nothing to
+            #split, the new arc goes to the right with an edge that comes up
+            #from below.
+            middle = ((above.site[0] + site[0]) / 2, site[1])
+            edge = Edge(above.index, index, above.site, site, middle, False)
+            self.edges.append(edge)
+
+            arc.right_edge = above.right_edge
+            above.right_edge = edge
+            arc.left_edge = edge
+            self.beachline.insert_after(above, arc)
+            self.check_circle_event(arc.next)
+            return
+
+        self.invalidate_circle_event(above)
+
+        #The new arc splits the arc above it into a left and right piece.
+        start = (site[0], parabola_output(above.site, site[1], site[0]))
+        left_edge = Edge(above.index, index, above.site, site, start)
+        right_edge = Edge(index, above.index, site, above.site, start)
+        left_edge.twin = right_edge #both halves of the same bisector
+        self.edges.append(left_edge)
+
+        right_piece = Arc(above.index, above.site,
+                          self.beachline.new_priority())
+        right_piece.right_edge = above.right_edge
+        right_piece.left_edge = right_edge
+        arc.left_edge = left_edge
+        arc.right_edge = right_edge
+        above.right_edge = left_edge
+
+        self.beachline.insert_after(above, arc)
+        self.beachline.insert_after(arc, right_piece)
+
+        self.check_circle_event(above)
+        self.check_circle_event(right_piece)
+
+    def handle_circle_event(self, event):
+        arc = event.arc
+        left = arc.prev
+        right = arc.next
+        vertex = event.center
+
+        arc.left_edge.end = vertex
+        arc.right_edge.end = vertex
+
+        edge = Edge(left.index, right.index, left.site, right.site, vertex)
+        self.edges.append(edge)
+        left.right_edge = edge
+        right.left_edge = edge
+
+        self.beachline.remove(arc)
+
+        self.invalidate_circle_event(left)
+        self.invalidate_circle_event(right)
+        self.check_circle_event(left)
+        self.check_circle_event(right)
+
+    def check_circle_event(self, arc):
+        if arc == None or arc.prev == None or arc.next == None:
+            return
+        if arc.prev.index == arc.next.index:
+            return
+
+        circle = circle_event(arc.prev.site, arc.site, arc.next.site)
+        if circle == None:
+            return
+
+        (y, center) = circle
+        if y < self.sweepline_height:
+            y = self.sweepline_height
+
+        event = Event(y, center[0], arc.index, arc, center)
+        arc.event = event
+        self.push_event(event)
+
+    def invalidate_circle_event(self, arc):
+        if arc.event != None:
+            arc.event.valid = False
+            arc.event = None
+    ############################################################################
+
+    #The following turns the edges into the output. Each edge is clipped to
+    #the width/height rectangle, then each seed gathers the endpoints of its
+    #edges plus any rectangle corners that are closest to it.
+    ############################################################################
+    def clip_edges(self):
+        #Each clipped edge looks like this --> (index1, index2, point1, point2)
+        self.clipped_edges = list()
+        for edge in self.edges:
+            segment = edge.clip(self.width, self.height)
+            if segment != None:
+                (point1, point2) = segment
+                self.clipped_edges.append((edge.left_index, edge.right_index,
+                                           point1, point2))
+
+    def generate_cells(self):
+        self.corners = list() #(index, corner) for each rectangle corner
+        for corner in [(0, 0), (self.width, 0),
+                       (self.width, self.height), (0, self.height)]:
+            closest = None
+            closest_distance = None
+            for (i, point) in enumerate(self.points):
+                distance = ((point[0] - corner[0]) ** 2 +
+                            (point[1] - corner[1]) ** 2)
+                if closest_distance == None or distance < closest_distance:
+                    closest = i
+                    closest_distance = distance
+            if closest != None:
+                self.corners.append((closest, corner))
+
+        cell_points = [dict() for _ in self.points]
+        for (i, j, point1, point2) in self.clipped_edges:
+            for point in (point1, point2):
+                key = point_key(point)
+                cell_points[i][key] = point
+                cell_points[j][key] = point
+        for (i, corner) in self.corners:
+            cell_points[i][point_key(corner)] = corner
+
+        #Cells are convex and always contain their seed, so going around the
+        #seed by angle puts the points in order.
+        self.cells = list()
+        for (i, points) in enumerate(cell_points):
+            (x, y) = self.points[i]
+            points = sorted(points.values(),
+                            key = lambda p: math.atan2(p[1] - y, p[0] - x))
+            self.cells.append(points)
+    ############################################################################
+
+class Arc(object):
+    def __init__(self, index, site, priority):
+        self.index = index #index of the seed point that made this arc
+        self.site = site
+        self.priority = priority
+
+        self.event = None #circle event that would remove this arc
+        self.left_edge = None
+        self.right_edge = None
+
+        #Neighbours along the beachline.
+        self.prev = None
+        self.next = None
+
+        #Tree links (see Beachline).
+        self.parent = None
+        self.left = None
+        self.right = None
+
+class Event(object):
+    def __init__(self, y, x, index, arc = None, center = None):
+        self.y = y
+        self.x = x
+        self.index = index
+        self.arc = arc #None for site events
+        self.center = center
+        self.valid = True
+
+class Edge(object):
+    #An edge is part of the perpendicular bisector of its two seeds. It starts
+    #at start (or comes up from infinitely far below if it has no start) and
+    #heads in direction until it reaches end (or forever if it has no end).
+    def __init__(self, left_index, right_index, left_site, right_site,
+                 origin, has_start = True):
+        self.left_index = left_index
+        self.right_index = right_index
+        self.origin = origin
+        self.start = origin if has_start else None
+        self.end = None
+        self.twin = None #other half, going the opposite way from origin
+
+        #Direction the breakpoint between the left and right arcs moves in.
+        self.direction = (left_site[1] - right_site[1],
+                          right_site[0] - left_site[0])
+
+    def clip(self, width, height):
+        #Liang-Barsky clipping of origin + t * direction against the rectangle
+        (x0, y0) = self.origin
+        (dx, dy) = self.direction
+
+        t_max = self.distance_along(self.end)
+        if self.twin != None:
+            t_min = -self.twin.distance_along(self.twin.end)
+        elif self.start != None:
+            t_min = 0
+        else:
+            t_min = -math.inf
+
+        for (p, q) in [(-dx, x0), (dx, width - x0),
+                       (-dy, y0), (dy, height - y0)]:
+            if p == 0:
+                if q < 0:
+                    return None
+            else:
+                t = q / p
+                if p < 0:
+                    t_min = max(t_min, t)
+                else:
+                    t_max = min(t_max, t)
+
+        if t_min > t_max or math.isinf(t_min) or math.isinf(t_max):
+            return None
+
+        point1 = (x0 + dx * t_min, y0 + dy * t_min)
+        point2 = (x0 + dx * t_max, y0 + dy * t_max)
+        return (point1, point2)
+
+    def distance_along(self, point):
+        #How many directions away from origin point is (infinite if no point).
+        if point == None:
+            return math.inf
+        (x0, y0) = self.origin
+        (dx, dy) = self.direction
+        return (((point[0] - x0) * dx + (point[1] - y0) * dy) /
+                (dx ** 2 + dy ** 2))
+
+class Beachline(object):
+    #The beachline is a treap: a binary tree ordered left to right along the
+    #beachline (in-order), kept balanced by giving every arc a random priority
+    #that has to be smaller than its children's. Arcs are also linked to their
+    #neighbours with prev/next so those are always O(1).
+    def __init__(self):
+        self.root = None
+        self.priorities = random.Random(0)
+
+    def new_priority(self):
+        return self.priorities.random()
+
+    def find(self, x, sweepline_height):
+        #Finds the arc that is directly above x.
+        arc = self.root
+        while arc != None:
+            if (arc.prev != None and arc.left != None and
+                x < breakpoint(arc.prev.site, arc.site, sweepline_height)):
+                arc = arc.left
+            elif (arc.next != None and arc.right != None and
+                  x > breakpoint(arc.site, arc.next.site, sweepline_height)):
+                arc = arc.right
+            else:
+                return arc
+        return None
+
+    def insert_after(self, arc, new_arc):
+        if arc == None:
+            self.root = new_arc
+            return
+
+        if arc.right == None:
+            arc.right = new_arc
+            new_arc.parent = arc
+        else:
+            leftmost = arc.right
+            while leftmost.left != None:
+                leftmost = leftmost.left
+            leftmost.left = new_arc
+            new_arc.parent = leftmost
+
+        new_arc.prev = arc
+        new_arc.next = arc.next
+        if arc.next != None:
+            arc.next.prev = new_arc
+        arc.next = new_arc
+
+        while (new_arc.parent != None and
+               new_arc.priority < new_arc.parent.priority):
+            self.rotate_up(new_arc)
+
+    def remove(self, arc):
+        #Rotate the arc down until it's a leaf, then cut it off.
+        while arc.left != None or arc.right != None:
+            if arc.right == None or (arc.left != None and
+                                     arc.left.priority < arc.right.priority):
+                self.rotate_up(arc.left)
+            else:
+                self.rotate_up(arc.right)
+
+        if arc.parent == None:
+            self.root = None
+        elif arc.parent.left is arc:
+            arc.parent.left = None
+        else:
+            arc.parent.right = None
+        arc.parent = None
+
+        if arc.prev != None:
+            arc.prev.next = arc.next
+        if arc.next != None:
+            arc.next.prev = arc.prev
+        arc.prev = arc.next = None
+
+    def rotate_up(self, arc):
+        parent = arc.parent
+        grandparent = parent.parent
+
+        if parent.left is arc:
+            parent.left = arc.right
+            if arc.right != None:
+                arc.right.parent = parent
+            arc.right = parent
+        else:
+            parent.right = arc.left
+            if arc.left != None:
+                arc.left.parent = parent
+            arc.left = parent
+        parent.parent = arc
+        arc.parent = grandparent
+
+        if grandparent == None:
+            self.root = arc
+        elif grandparent.left is parent:
+            grandparent.left = arc
+        else:
+            grandparent.right = arc
+
+def parabola_output(focus, directrix, x):
+    #Same parabola as parabola.py: points equally far from the focus and the
+    #directrix (the sweepline).
+    (fx, fy) = focus
+    return ((x - fx) ** 2 + fy ** 2 - directrix ** 2) / (2 * (fy - directrix))
+
+def breakpoint(left_site, right_site, directrix):
+    #The x-value where the left site's arc meets the right site's arc.
+    (x1, y1) = left_site
+    (x2, y2) = right_site
+
+    if y1 == y2:
+        return (x1 + x2) / 2
+    if y1 == directrix: #arc is still just a vertical ray
+        return x1
+    if y2 == directrix:
+        return x2
+
+    d1 = 2 * (y1 - directrix)
+    d2 = 2 * (y2 - directrix)
+    a = 1 / d1 - 1 / d2
+    b = -2 * (x1 / d1 - x2 / d2)
+    c = ((x1 ** 2 + y1 ** 2 - directrix ** 2) / d1 -
+         (x2 ** 2 + y2 ** 2 - directrix ** 2) / d2)
+
+    root = math.sqrt(max(b ** 2 - 4 * a * c, 0))
+    x_low = min((-b - root) / (2 * a), (-b + root) / (2 * a))
+    x_high = max((-b - root) / (2 * a), (-b + root) / (2 * a))
+
+    #The newer (higher) seed has the narrower parabola, which is on top
+    #between the two intersections.
+    if y1 > y2:
+        return x_high
+    else:
+        return x_low
+
+def circle_event(left_site, middle_site, right_site):
+    #Returns (sweepline height, center) of when the middle arc gets squeezed
+    #out by its neighbours, or None if it never does.
+    (ax, ay) = left_site
+    (bx, by) = middle_site
+    (cx, cy) = right_site
+
+    #The breakpoints only move toward each other (squeezing the middle arc)
+    #if the three seeds turn counter-clockwise.
+    if (bx - ax) * (cy - by) - (by - ay) * (cx - bx) <= 0:
+        return None
+
+    center = circumcenter(left_site, middle_site, right_site)
+    if center == None:
+        return None
+
+    radius = math.hypot(center[0] - bx, center[1] - by)
+    return (center[1] + radius, center)
+
+def circumcenter(point1, point2, point3):
+    (ax, ay) = point1
+    (bx, by) = point2
+    (cx, cy) = point3
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if d == 0: #collinear
+        return None
+    a2 = ax ** 2 + ay ** 2
+    b2 = bx ** 2 + by ** 2
+    c2 = cx ** 2 + cy ** 2
+    x = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+    y = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    return (x, y)
+
+def point_key(point):
+    #Rounded so the same vertex found from different edges is only kept once.
+    return (round(point[0], 6), round(point[1], 6))
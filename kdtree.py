@@ -0,0 +1,125 @@
+################################################################################
+#
+#   kdtree.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import heapq
+
+#Some notes:
+#   1) The voronoi cell a point is in is just the cell of the seed nearest to
+#      it, so "which cell is this in?" is a nearest-point question. A k-d tree
+#      answers that by only looking at the parts of the map that could hold
+#      something closer than the best found so far (about log n seeds instead
+#      of testing every cell's polygon).
+#   2) The tree is kept in one list of point indices. Each range [low, high)
+#      of it is split at its middle point: everything before the middle is on
+#      one side of it (left/below, depending on the axis) and everything after
+#      is on the other. The axis switches between x and y at every level.
+#   3) The batched queries go through the points in the order given, starting
+#      each search with the answer for the last point. Points near each other
+#      (like a batch from one cell) usually have the same answer, so most of
+#      the tree gets skipped right away.
+#   4) Distances are squared (only which one is smaller matters).
+
+class Kd_tree(object):
+    def __init__(self, points):
+        self.points = [tuple(point) for point in points]
+        self.indices = list(range(len(self.points)))
+        self.build(0, len(self.indices), 0)
+
+    def build(self, low, high, axis):
+        if high - low <= 1:
+            return
+        self.indices[low:high] = sorted(self.indices[low:high],
+                                        key = lambda i: self.points[i][axis])
+        middle = (low + high) // 2
+        self.build(low, middle, 1 - axis)
+        self.build(middle + 1, high, 1 - axis)
+
+    def nearest(self, point, hint = None):
+        #Index of the nearest point (None if there aren't any). hint is an
+        #index that's probably close (see note 3).
+        if len(self.points) == 0:
+            return None
+        if hint == None:
+            hint = self.indices[len(self.indices) // 2]
+
+        (x, y) = point
+        (hint_x, hint_y) = self.points[hint]
+        best = [(hint_x - x) ** 2 + (hint_y - y) ** 2, hint]
+        self.search_nearest(x, y, 0, len(self.indices), 0, best)
+        return best[1]
+
+    def search_nearest(self, x, y, low, high, axis, best):
+        if low >= high:
+            return
+        middle = (low + high) // 2
+        i = self.indices[middle]
+        (point_x, point_y) = self.points[i]
+        distance = (point_x - x) ** 2 + (point_y - y) ** 2
+        if distance < best[0]:
+            best[0] = distance
+            best[1] = i
+
+        if axis == 0:
+            difference = x - point_x
+        else:
+            difference = y - point_y
+        if difference < 0: #point is on the low side
+            self.search_nearest(x, y, low, middle, 1 - axis, best)
+            if difference ** 2 < best[0]: #something closer might be across
+                self.search_nearest(x, y, middle + 1, high, 1 - axis, best)
+        else:
+            self.search_nearest(x, y, middle + 1, high, 1 - axis, best)
+            if difference ** 2 < best[0]:
+                self.search_nearest(x, y, low, middle, 1 - axis, best)
+
+    def k_nearest(self, point, k):
+        #Indices of the k nearest points, nearest first.
+        k = min(k, len(self.points))
+        if k <= 0:
+            return [ ]
+
+        (x, y) = point
+        found = list() #heap of (-distance, index) so the farthest is first
+        self.search_k_nearest(x, y, 0, len(self.indices), 0, k, found)
+        found.sort(reverse = True)
+        return [i for (_, i) in found]
+
+    def search_k_nearest(self, x, y, low, high, axis, k, found):
+        if low >= high:
+            return
+        middle = (low + high) // 2
+        i = self.indices[middle]
+        (point_x, point_y) = self.points[i]
+        distance = (point_x - x) ** 2 + (point_y - y) ** 2
+        if len(found) < k:
+            heapq.heappush(found, (-distance, i))
+        elif distance < -found[0][0]:
+            heapq.heapreplace(found, (-distance, i))
+
+        if axis == 0:
+            difference = x - point_x
+        else:
+            difference = y - point_y
+        if difference < 0:
+            (near, far) = ((low, middle), (middle + 1, high))
+        else:
+            (near, far) = ((middle + 1, high), (low, middle))
+        self.search_k_nearest(x, y, *near, 1 - axis, k, found)
+        if len(found) < k or difference ** 2 < -found[0][0]:
+            self.search_k_nearest(x, y, *far, 1 - axis, k, found)
+
+    def nearest_batch(self, points):
+        #nearest for every point (see note 3).
+        indices = list()
+        hint = None
+        for point in points:
+            hint = self.nearest(point, hint)
+            indices.append(hint)
+        return indices
+
+    def k_nearest_batch(self, points, k):
+        return [self.k_nearest(point, k) for point in points]
@@ -1,20 +1,62 @@
-import pyglet
-from pyglet.gl import GL_TRIANGLES
+import math
 import shapes
 import map_obj
+import quadtree
+
+#A headless layer has no batch (nothing is drawn), so pyglet is never imported
+#and the layer can be used for placing objects without a display
+#(see map_generator.py).
+
+#The regions are a grid (made column by column, see generate_regions), so the
+#region at a position, or the regions under an object's bounding box, are
+#found with a little arithmetic instead of checking every region.
+
+#The layer also remembers which regions each object went into (obj_regions),
+#so removing an object (like when it's picked up to be moved) only touches
+#those regions.
+
+#With index = "quadtree", objects are kept in a quadtree (see quadtree.py)
+#instead of the regions, which splits itself up more where there are more
+#objects. The regions are still made (for the grid) but stay empty. The
+#quadtree has the boxes around whole objects (not just the parts that
+#collide) so clicking anywhere on one still finds it.
+
+#Checking if an object can go somewhere is done in two steps. First every
+#object it could hit is gathered once (an object in several of the same
+#regions is still only checked once), and ones whose bounding boxes don't
+#even touch its box are skipped (the "broadphase"). Only the rest get the
+#full check (the "narrowphase"), where each of its collision shapes is checked
+#against all of the other object's at once (see Simple_polygon.intersects_many
+#in polygon.py), stopping at the first hit. How many got through each step
+#is counted in collision_stats (see Collision_stats).
 
 class Layer(object):
-    def __init__(self, width, height, color, region_width = 300, region_height = 300):
+    def __init__(self, width, height, color, region_width = 300, region_height = 300, headless = False, index = "regions"):
         self.width = width
         self.height = height
         self.color = color
         self.region_width = region_width
         self.region_height = region_height
-        self.batch = pyglet.graphics.Batch()
-        self.generate_background()
+        self.headless = headless
+        self.obj_regions = dict() #map_obj --> regions it's in
+        self.collision_stats = Collision_stats()
+        self.index = index
+        if self.index == "quadtree":
+            self.quadtree = quadtree.Quadtree(0, self.width, 0, self.height)
+        elif self.index == "regions":
+            self.quadtree = None
+        else:
+            raise Exception(f"Unknown layer index {self.index!r}")
+        if self.headless:
+            self.batch = None
+        else:
+            import pyglet
+            self.batch = pyglet.graphics.Batch()
+            self.generate_background()
         self.generate_regions()
 
     def generate_background(self):
+        from pyglet.gl import GL_TRIANGLES
         self.shape = shapes.Rect((self.width / 2, self.height / 2), self.width, self.height)
         self.num_points = len(self.shape.triangular_points) // 2
         self.background_vertices = ("v2f", self.shape.triangular_points)
@@ -46,33 +88,128 @@ class Layer(object):
             x += width
             total_height = 0
             y = 0
+        self.region_columns = int(math.ceil(self.width / self.region_width))
+        self.region_rows = int(math.ceil(self.height / self.region_height))
+
+    def get_column(self, x):
+        return min(max(int(x // self.region_width), 0), self.region_columns - 1)
+
+    def get_row(self, y):
+        return min(max(int(y // self.region_height), 0), self.region_rows - 1)
 
     def get_region_at_pos(self, pos):
-        for region in self.regions:
-            if region.shape.contains_point(pos):
-                return region
+        (x, y) = pos
+        if not (0 <= x <= self.width and 0 <= y <= self.height):
+            return None
+        return self.regions[self.get_column(x) * self.region_rows +
+                            self.get_row(y)]
+
+    def get_regions_in_box(self, min_x, max_x, min_y, max_y):
+        #Every region touching the box (a box right on the line between two
+        #regions touches both).
+        first_column = self.get_column(
+                            (math.ceil(min_x / self.region_width) - 1) *
+                            self.region_width)
+        last_column = self.get_column(max_x)
+        first_row = self.get_row((math.ceil(min_y / self.region_height) - 1) *
+                                 self.region_height)
+        last_row = self.get_row(max_y)
+        regions = list()
+        for column in range(first_column, last_column + 1):
+            start = column * self.region_rows
+            regions.extend(self.regions[start + first_row:start + last_row + 1])
+        return regions
+
+    def get_obj_regions(self, map_obj):
+        #The regions the object's collision shapes are in.
+        box = map_obj.get_bounding_box()
+        if box == None:
+            return [ ]
+        return [region for region in self.get_regions_in_box(*box)
+                if region.object_in_region(map_obj)]
 
     def get_obj_at_pos(self, pos):
+        if self.quadtree != None:
+            return get_obj_at_pos(self.quadtree.query_point(pos), pos)
         region = self.get_region_at_pos(pos)
+        if region == None:
+            return None
         return region.get_obj_at_pos(pos)
 
+    def objects(self):
+        #Every object in the layer (once each).
+        if self.quadtree != None:
+            return list(self.quadtree)
+        return list(self.obj_regions)
+
+    def get_nearby_objs(self, map_obj, regions = None):
+        #Every object (once) that shares a region with map_obj, or for the
+        #quadtree, whose bounding box touches map_obj's.
+        if self.quadtree != None:
+            box = map_obj.get_bounding_box(collision_only = False)
+            if box == None:
+                return [ ]
+            objs = self.quadtree.query_box(box)
+        else:
+            if regions == None:
+                regions = self.get_obj_regions(map_obj)
+            objs = set()
+            for region in regions:
+                objs.update(region.objects)
+        return [obj for obj in objs if obj is not map_obj]
+
+    def intersects_any(self, map_obj, objs):
+        #Broadphase and then narrowphase (see above).
+        stats = self.collision_stats
+        box = map_obj.get_bounding_box()
+        if box == None:
+            return False
+
+        shapes = [component.shape for component in map_obj.components if component.for_collision]
+        for obj in objs:
+            stats.candidates += 1
+            other_box = obj.get_bounding_box()
+            if other_box == None or not quadtree.boxes_overlap(box, other_box):
+                continue
+            stats.box_hits += 1
+            other_shapes = [component.shape for component in obj.components if component.for_collision]
+            for shape in shapes:
+                if shape.intersects_many(other_shapes):
+                    stats.collisions += 1
+                    return True
+        return False
+
     def add(self, map_obj):
-        for region in self.regions:
-            if region.object_in_region(map_obj):
-                region.add(map_obj)
+        if self.quadtree != None:
+            box = map_obj.get_bounding_box(collision_only = False)
+            self.quadtree.insert(map_obj, box)
+            return
+        self.add_to_regions(map_obj, self.get_obj_regions(map_obj))
+
+    def add_to_regions(self, map_obj, regions):
+        self.obj_regions[map_obj] = regions
+        for region in regions:
+            region.add(map_obj)
 
     def add_if_not_intersecting(self, map_obj):
-        for region in self.regions:
-            if region.object_in_region(map_obj):
-                if region.objects_in_region_intersect(map_obj):
-                    return False
-        self.add(map_obj)
+        regions = None
+        if self.quadtree == None:
+            regions = self.get_obj_regions(map_obj)
+        if self.intersects_any(map_obj, self.get_nearby_objs(map_obj, regions)):
+            return False
+
+        if self.quadtree != None:
+            self.add(map_obj)
+        else:
+            self.add_to_regions(map_obj, regions)
         return True
 
     def remove_obj(self, map_obj):
-        for region in self.regions:
-            if map_obj in region.objects:
-                region.objects.remove(map_obj)
+        if self.quadtree != None:
+            self.quadtree.remove(map_obj)
+            return
+        for region in self.obj_regions.pop(map_obj, [ ]):
+            region.objects.discard(map_obj)
 
     def draw(self):
         self.batch.draw()
@@ -83,7 +220,25 @@ class Layer(object):
         else:
             visibility = 0
         for region in self.regions:
-            region.change_visibility(visibility)
+            if region.vertex_list != None:
+                region.change_visibility(visibility)
+
+class Collision_stats(object):
+    #How many objects got through each step of checking for collisions.
+    def __init__(self):
+        self.candidates = 0 #nearby objects checked
+        self.box_hits = 0 #bounding boxes touched (went on to narrowphase)
+        self.collisions = 0 #actually hit
+
+    def __repr__(self):
+        return (f"{self.candidates} nearby, {self.box_hits} boxes touched, "
+                f"{self.collisions} hit ({self.pruning_rate():.0%} pruned)")
+
+    def pruning_rate(self):
+        #How many nearby objects were skipped without checking their shapes.
+        if self.candidates == 0:
+            return 0
+        return 1 - self.box_hits / self.candidates
 
 class Region(object):
     def __init__(self, pos, width, height, parent):
@@ -93,10 +248,27 @@ class Region(object):
         self.objects = set()
         self.border_color = [100, 100, 100, 0]
         self.shape = shapes.Rect(self.pos, self.width, self.height)
+
+        #Regions along the edges reach out forever so that objects hanging off
+        #the edge of the layer are still in a region (see object_in_region).
+        (min_x, max_x, min_y, max_y) = self.shape.get_maxs_mins()
+        if min_x <= 1e-6:
+            min_x = -math.inf
+        if max_x >= parent.width - 1e-6:
+            max_x = math.inf
+        if min_y <= 1e-6:
+            min_y = -math.inf
+        if max_y >= parent.height - 1e-6:
+            max_y = math.inf
+        self.box = (min_x, max_x, min_y, max_y)
+
         self.num_points = len(self.shape.lines_points) // 2
-        self.vertex_list = parent.batch.add(self.num_points, pyglet.gl.GL_LINES,
-                             None, ("v2f", self.shape.lines_points), 
-                             ("c4B", self.border_color * self.num_points))
+        self.vertex_list = None
+        if parent.batch != None:
+            from pyglet.gl import GL_LINES
+            self.vertex_list = parent.batch.add(self.num_points, GL_LINES,
+                                 None, ("v2f", self.shape.lines_points), 
+                                 ("c4B", self.border_color * self.num_points))
 
     def __repr__(self):
         return f"Region ({self.width, self.height}) at {self.pos}"
@@ -105,24 +277,27 @@ class Region(object):
         self.objects.add(map_obj)
  
     def object_in_region(self, map_obj):
-        for component in map_obj.components:
-            if component.for_collision and component.intersects(self):
-                return True
-        return False
+        #If the box around the object's collision components touches the
+        #region. Two objects that could collide always share a region.
+        box = map_obj.get_bounding_box()
+        return box != None and quadtree.boxes_overlap(box, self.box)
 
     def objects_in_region_intersect(self, map_obj):
         for obj in self.objects:
-            if obj.intersects(map_obj):
+            if obj is not map_obj and obj.intersects(map_obj):
                 return True
         return False
 
     def get_obj_at_pos(self, pos):
-        for obj in self.objects:
-            for component in obj.components:
-                if component.shape.contains_point(pos):
-                    return obj
-        return None
+        return get_obj_at_pos(self.objects, pos)
 
     def change_visibility(self, visibility):
         for i in range(3, len(self.vertex_list.colors), 4):
-            self.vertex_list.colors[i] = visibility
\ No newline at end of file
+            self.vertex_list.colors[i] = visibility
+
+def get_obj_at_pos(objects, pos):
+    for obj in objects:
+        for component in obj.components:
+            if component.shape.contains_point(pos):
+                return obj
+    return None
@@ -0,0 +1,131 @@
+################################################################################
+#
+#   map_farm.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import argparse
+import concurrent.futures
+import csv
+import os
+import time
+
+import map_generator
+
+#Some notes:
+#   1) This makes a whole bunch of random maps at once using a pool of
+#      processes (one map per job, and jobs don't share anything), so it gets
+#      faster with every core that's available.
+#   2) Every job gets its own RNG seed (start_seed + job number), so any map in
+#      a batch can be made again by running just that seed.
+#   3) A job that fails (ex: "Too many seeds and/or too much padding" from
+#      voronoi.py) is logged and written to the stats file but doesn't stop
+#      the rest of the batch.
+#   4) Run it from the command line, ex:
+#           -- python3 map_farm.py maps --count 1000 --seeds 30 --padding 100
+#      Each map is saved as "map <seed>.txt" in the output folder (they can be
+#      loaded into maparoni-n-cheese like any other save file) along with
+#      stats.csv, which has the timing for each map.
+#   5) If a cache folder is given, solved diagrams are shared through it (see
+#      diagram_cache.py), so running the same seeds again skips the solving.
+
+stats_fields = ["seed", "file", "seeds", "padding", "objects", "attempts",
+                "solve_time", "populate_time", "total_time", "error"]
+
+def make_map(seed, folder, width, height, seeds_number, seeds_padding,
+             cache_folder = None):
+    #Runs in a worker process. Returns a row for the stats file either way.
+    stats = {"seed": seed, "file": "", "seeds": seeds_number,
+             "padding": seeds_padding, "objects": 0, "attempts": 0,
+             "solve_time": 0,
+             "populate_time": 0, "total_time": 0, "error": ""}
+    start = time.perf_counter()
+
+    try:
+        map_maker = map_generator.Headless_map_maker(width, height,
+                                                     seeds_number,
+                                                     seeds_padding,
+                                                     seed, cache_folder)
+        map_maker.voronoi_setup()
+        map_maker.solve_voronoi()
+        solved = time.perf_counter()
+        stats["solve_time"] = round(solved - start, 4)
+
+        map_maker.populate_voronoi()
+        stats["populate_time"] = round(time.perf_counter() - solved, 4)
+        stats["attempts"] = sum(cell_stats.attempts
+                                for cell_stats in map_maker.population_stats)
+
+        save_string = map_maker.make_save_string()
+        file_path = os.path.join(folder, f"map {seed}.txt")
+        with open(file_path, "w") as f:
+            f.write(save_string)
+
+        stats["file"] = file_path
+        stats["objects"] = save_string.count("\n")
+
+    except Exception as error:
+        stats["error"] = f"{type(error).__name__}: {error}"
+
+    stats["total_time"] = round(time.perf_counter() - start, 4)
+    return stats
+
+def farm(folder, count, start_seed = 0, workers = None,
+         width = 1200, height = 630, seeds_number = 30, seeds_padding = 100,
+         cache_folder = None):
+    #Makes count maps in folder and returns the stats rows (in seed order).
+    os.makedirs(folder, exist_ok = True)
+    rows = list()
+    failed = 0
+    start = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        jobs = [executor.submit(make_map, seed, folder, width, height,
+                                seeds_number, seeds_padding, cache_folder)
+                for seed in range(start_seed, start_seed + count)]
+
+        for job in concurrent.futures.as_completed(jobs):
+            try:
+                stats = job.result()
+            except Exception as error: #the worker process itself died
+                stats = {"seed": jobs.index(job) + start_seed,
+                         "error": f"{type(error).__name__}: {error}"}
+
+            if stats["error"] != "":
+                failed += 1
+                print(f"map {stats['seed']} failed ({stats['error']})")
+            rows.append(stats)
+
+    rows.sort(key = lambda stats: stats["seed"])
+    with open(os.path.join(folder, "stats.csv"), "w", newline = "") as f:
+        writer = csv.DictWriter(f, stats_fields, restval = "")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    total = time.perf_counter() - start
+    print(f"{count - failed} of {count} maps made in {total:.2f}s "
+          f"({count / total:.2f} maps/s)")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(
+                description = "Make a batch of random maps in parallel.")
+    parser.add_argument("folder", help = "folder to put the save files in")
+    parser.add_argument("--count", type = int, default = 10)
+    parser.add_argument("--start-seed", type = int, default = 0)
+    parser.add_argument("--workers", type = int, default = None,
+                        help = "number of processes (default: every core)")
+    parser.add_argument("--width", type = int, default = 1200)
+    parser.add_argument("--height", type = int, default = 630)
+    parser.add_argument("--seeds", type = int, default = 30)
+    parser.add_argument("--padding", type = int, default = 100)
+    parser.add_argument("--cache", default = None,
+                        help = "folder for caching solved diagrams")
+    args = parser.parse_args()
+
+    farm(args.folder, args.count, args.start_seed, args.workers,
+         args.width, args.height, args.seeds, args.padding, args.cache)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+################################################################################
+#
+#   map_generator.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import argparse
+import collections
+import math
+import random
+import time
+
+import diagram_cache
+import layer
+import map_obj
+import poisson
+import polygon_sampler
+import voronoi
+
+#Some notes:
+#   1) This is the random map generation from maparoni-n-cheese.py without the
+#      window. Map_maker uses Map_generator for making/populating its maps, and
+#      Headless_map_maker uses it on its own (no pyglet or tkinter anywhere) so
+#      maps can be made on machines without a display.
+#   2) It can be run straight from the command line to make a save file that
+#      can be loaded into maparoni-n-cheese:
+#           -- python3 map_generator.py "my map.txt" --seeds 30 --padding 100
+#      (see main for all of the options).
+#   3) Every map has an rng seed (picked at random unless voronoi_rng_seed is
+#      set), and the same rng seed with the same settings always makes the same
+#      map. The diagram gets its own rng and the population gets another one,
+#      so a cached diagram (see diagram_cache.py) still gets the same objects.
+#   4) With voronoi_scatter on, every cell's spots are made up front with
+#      Poisson-disk sampling (see poisson.Footprint_disk) instead of trying
+#      random spots. Every object type gets the box around its collision
+#      shapes (its "footprint"), and each spot comes with an object type
+#      whose footprint doesn't overlap any other spot's (in its cell or the
+#      ones made before it). Those can't collide, so nearly every spot is
+#      placed and objects are only made for spots where they'll actually fit
+#      (see scatter_positions).
+#   5) Cells don't all get the same number of attempts. A cell stops once it's
+#      full (less than voronoi_population_min_rate of its last
+#      voronoi_population_window attempts were placed), and if
+#      voronoi_population_density is set, a cell that isn't that dense yet
+#      keeps going past voronoi_population_attempts (up to
+#      voronoi_population_max_attempts). How each cell went is kept in
+#      seed.population_stats and population_stats (see Cell_stats).
+
+class Map_generator(object):
+    #Anything using this needs a layer (see Headless_map_maker.layer_setup) and
+    #needs to call obj_setup before making any objects.
+    def obj_setup(self):
+        #These are all of the sets of arguments for "object_type" and
+        #"object_subtype" that can be passed into make_map_object to receive
+        #the specified object.
+        self.map_obj_types = [
+                            ["Tree", "Oak"],
+                            ["Tree", "Spruce"],
+                            ["Mountain", "Snowy"],
+                            ["Hill"],
+                            ["House"]
+                             ]
+
+        #These are the sets of objects that go in a given
+        #region of the voronoi diagram (random map generation).
+        self.voronoi_object_sets = [
+                            [ ["Tree", "Oak"], ["Mountain"] ],
+                            [ ["Tree", "Spruce"], ["Mountain", "Snowy"] ],
+                            [ ["Tree", "Oak"], ["House"] ],
+                            [ ["Tree", "Spruce"], ["House"] ],
+                            [ ["Hill"] ],
+                                   ]
+
+        #For scaling objects' sizes (see on_mouse_scroll).
+        self.scale = 1
+
+        #The following are parameters for creating the map objects. They can
+        #be easily changed to modify the look and colors of objects.
+        #Colors are ALWAYS a list of 4 integers (0-255) --> [r, g, b, a]
+        #======================================================================#
+        self.oak_tree_leaf_color =  [45, 112, 3, 255]
+        self.oak_tree_trunk_color = [112, 52, 3, 255]
+        self.oak_tree_leaves = 1
+        self.oak_tree_width = 15
+        self.oak_tree_height = 20
+
+        self.spruce_tree_leaf_color =  [30, 85, 25, 255]
+        self.spruce_tree_trunk_color = [95, 60,  0, 255]
+        self.spruce_tree_leaves = 2 #anything over 3 or 4 looks a little odd :P
+        self.spruce_tree_width = 10
+        self.spruce_tree_height = 20
+
+        self.mountain_rock_color = [112, 112, 112, 255]
+        self.mountain_snow_color = [255, 255, 255, 255]
+        self.mountain_width = 30
+        self.mountain_height = 40
+
+        self.hill_color = [15, 112, 26, 255]
+        self.hill_radius = 5
+
+        self.lake_water_color = [0, 0, 112, 255]
+        self.lake_radius = 10
+
+        self.house_wall_color = [200, 112, 70, 255]
+        self.house_door_color = [112, 70, 40, 255]
+        self.house_roof_color = [80, 70, 65, 255]
+        self.house_width = 10
+        self.house_height = 10
+        #======================================================================#
+
+        #Random map generation parameters.
+        #Be aware that if the seed number is too large, it may take
+        #a very (very) long time to solve the voronoi diagram.
+        #Also note that if too many seeds exist with too high padding,
+        #a diagram may fail to be created.
+        #======================================================================#
+        self.voronoi_seeds_number = 30
+        self.voronoi_seeds_padding = 100
+        self.voronoi_adaptive = True #(see voronoi.py note 6)
+        self.voronoi_population_attempts = 200 #(see populate_seed for use)
+        self.voronoi_population_window = 40 #recent attempts looked at
+        self.voronoi_population_min_rate = 0.1 #placed in the window --> full
+        self.voronoi_population_density = None #objects per 100x100 (note 5)
+        self.voronoi_population_max_attempts = 1000
+        self.voronoi_scatter = True #(see note 4)
+        self.voronoi_scatter_attempts = 8 #tries around each spot (note 4)
+        self.voronoi_rng_seed = None #None picks a new one for every map
+        self.voronoi_cache_folder = None #None means don't cache diagrams
+        self.voronoi_cache_size = 50 * 1024 * 1024 #bytes
+        #======================================================================#
+
+    def voronoi_setup(self):
+        #The rng seed is kept so the map can be made again (see note 3).
+        self.rng_seed = self.voronoi_rng_seed
+        if self.rng_seed == None:
+            self.rng_seed = random.randrange(2 ** 32)
+        self.voronoi_rng = random.Random(self.rng_seed)
+        self.population_rng = random.Random(f"populate {self.rng_seed}")
+
+        self.diagram_cache = None
+        self.diagram_key = diagram_cache.make_key(self.layer_width,
+                                                  self.layer_height,
+                                                  self.voronoi_seeds_number,
+                                                  self.voronoi_seeds_padding,
+                                                  self.rng_seed)
+        if self.voronoi_cache_folder != None:
+            self.diagram_cache = diagram_cache.Diagram_cache(
+                                    self.voronoi_cache_folder,
+                                    self.voronoi_cache_size)
+
+            #A diagram that's been solved before comes back already solved.
+            diagram = self.diagram_cache.get(self.diagram_key)
+            if diagram != None:
+                (points, cells) = diagram
+                self.voronoi = voronoi.Voronoi(self.layer_width,
+                                               self.layer_height,
+                                               self.voronoi_seeds_number, 
+                                               self.voronoi_seeds_padding,
+                                               points = points)
+                self.voronoi.load_cells(cells)
+                return
+
+        self.voronoi = voronoi.Voronoi(self.layer_width,
+                                       self.layer_height,
+                                       self.voronoi_seeds_number, 
+                                       self.voronoi_seeds_padding,
+                                       adaptive = self.voronoi_adaptive,
+                                       rng = self.voronoi_rng)
+
+    def solve_voronoi(self):
+        #Nothing is drawn until it's done, so only the cells are needed and
+        #they can be made exactly (unless it came from the cache already
+        #solved). See voronoi.py note 8.
+        if self.voronoi.is_solved():
+            return
+
+        self.voronoi.build_cells()
+        self.cache_voronoi()
+
+    def cache_voronoi(self):
+        #Keeps the solved diagram so the same map is quick to make again.
+        if self.diagram_cache != None:
+            self.diagram_cache.put(self.diagram_key, self.voronoi.points,
+                                   self.voronoi.get_cells())
+
+    def generate_map(self):
+        #Makes a whole map in one go (the non-visual random map generation).
+        self.voronoi_setup()
+        self.solve_voronoi()
+
+        #Adds map objects to the diagram randomly.
+        self.populate_voronoi()
+
+    def populate_voronoi(self):
+        self.population_setup()
+        for seed in self.voronoi.seeds:
+            self.populate_seed(seed)
+
+    def population_setup(self):
+        self.footprints_setup()
+        self.population_stats = list()
+        for seed in self.voronoi.seeds:
+            #Each seed in a voronoi diagram has a polygonal shape around it.
+            polygon = seed.get_polygon()
+            seed.polygon = polygon
+
+            #Choose a set of objects to fill with. (defined in obj_setup)
+            seed.map_obj_set = self.population_rng.choice(
+                                                    self.voronoi_object_sets)
+
+            #Every attempt is already inside the cell (see polygon_sampler.py).
+            seed.sampler = polygon_sampler.Polygon_sampler(polygon.points,
+                                                           self.population_rng)
+            seed.positions = list()
+            if self.voronoi_scatter: #all of them up front (see note 4)
+                seed.positions = self.scatter_positions(seed)
+            seed.population_stats = Cell_stats(seed.sampler.area,
+                                               self.voronoi_population_window)
+            self.population_stats.append(seed.population_stats)
+
+    def populate_seed(self, seed):
+        #Keep trying placements until the cell is done (see note 5).
+        while self.populate_step(seed):
+            pass
+
+    def populate_step(self, seed):
+        #One attempt in the seed's cell. Returns False once the cell is done.
+        stats = seed.population_stats
+        if stats.done or self.population_done(stats):
+            stats.done = True
+            return False
+
+        if len(seed.positions) == 0:
+            if not self.voronoi_scatter: #(scatter spots are all made already)
+                seed.positions = self.sample_positions(seed, 64)
+            if len(seed.positions) == 0: #no room at all
+                stats.done = True
+                return False
+
+        if self.voronoi_scatter:
+            (pos, obj_type) = seed.positions.pop()
+        else:
+            pos = seed.positions.pop()
+            obj_type = self.population_rng.choice(seed.map_obj_set)
+        stats.add(self.place_map_obj(pos, obj_type))
+        return True
+
+    def population_done(self, stats):
+        if stats.recent_rate() < self.voronoi_population_min_rate:
+            return True #full
+
+        attempts = self.voronoi_population_attempts
+        density = self.voronoi_population_density
+        if density != None and stats.density() < density:
+            attempts = self.voronoi_population_max_attempts #keep going
+        return stats.attempts >= attempts
+
+    def sample_positions(self, seed, count):
+        #Random whole-number positions inside the seed's polygon. Rounding can
+        #move a position right on the edge into the cell next door, so the
+        #whole batch is checked for which cell each one is really in (the
+        #nearest seed, see voronoi.py note 10) and those are dropped.
+        positions = [(int(round(x)), int(round(y)))
+                     for (x, y) in seed.sampler.sample(count)]
+        indices = self.voronoi.get_seed_indices_at(positions)
+        return [position for (position, index) in zip(positions, indices)
+                if index == seed.index]
+
+    def scatter_positions(self, seed):
+        #(pos, obj_type) for the spots in the seed's cell (see note 4), in the
+        #order they'll be placed. Spots are whole numbers in the cell (the
+        #nearest seed, like sample_positions). The cell is filled and then
+        #thinned out at random to as many as it could use (see
+        #population_done).
+        count = self.voronoi_population_attempts
+        density = self.voronoi_population_density
+        if density != None:
+            needed = math.ceil(density * seed.sampler.area / 100 ** 2)
+            count = max(count,
+                        min(needed, self.voronoi_population_max_attempts))
+
+        (min_x, max_x, min_y, max_y) = seed.polygon.get_maxs_mins()
+        obj_types = [tuple(obj_type) for obj_type in seed.map_obj_set]
+        sampler = poisson.Footprint_disk(
+                self.footprint_grid,
+                max(min_x, 0), max(min_y, 0),
+                min(max_x, self.layer_width), min(max_y, self.layer_height),
+                self.footprints,
+                lambda rng: rng.choice(obj_types),
+                inside = lambda pos: (self.voronoi.get_seed_at_pos(pos, seed)
+                                      is seed),
+                rng = self.population_rng,
+                attempts = self.voronoi_scatter_attempts,
+                integer = True)
+        sampler.sample()
+        return sampler.keep(count)
+
+    def population_report(self):
+        #A line for each cell and one for all of them together.
+        lines = ["cell  attempts  placed  rejected  rate   density"]
+        total = Cell_stats(0)
+        for (i, stats) in enumerate(self.population_stats):
+            lines.append(f"{i:>4}  {stats}")
+            total.area += stats.area
+            total.attempts += stats.attempts
+            total.placed += stats.placed
+            total.rejected += stats.rejected
+        lines.append(f" all  {total}")
+        lines.append(f"collisions: {self.layer.collision_stats}")
+        return "\n".join(lines)
+
+    def footprints_setup(self):
+        #Measures one of each object type (at the current scale) for its
+        #footprint (see note 4): the offset from pos to the middle of the box
+        #around its collision shapes and half of the box's width and height.
+        self.footprints = dict()
+        obj_types = list(self.map_obj_types)
+        for obj_set in self.voronoi_object_sets:
+            obj_types.extend(obj_set)
+
+        for obj_type in obj_types:
+            #Made at (0, 0), so the box's middle is the offset.
+            obj = self.make_map_obj((0, 0), *obj_type)
+            (min_x, max_x, min_y, max_y) = obj.get_bounding_box()
+            offset = ((min_x + max_x) / 2, (min_y + max_y) / 2)
+            half_size = ((max_x - min_x) / 2, (max_y - min_y) / 2)
+            self.footprints[tuple(obj_type)] = (offset, half_size)
+
+        max_half_size = max(max(half_size)
+                            for (_, half_size) in self.footprints.values())
+        self.footprint_grid = poisson.Footprint_grid(0, 0,
+                                                     self.layer_width,
+                                                     self.layer_height,
+                                                     max_half_size)
+
+    def place_map_obj(self, pos, obj_type):
+        #Adds the object if there's room. Returns True if it was. Scattered
+        #spots already have room (see note 4), but they're still checked
+        #against the layer for objects placed by hand.
+        return self.add_map_obj(pos, *obj_type) #*obj in case of a subtype
+
+    def add_map_obj(self, pos, obj_type, obj_subtype = None,
+                    from_cursor = False):
+        #From cursor is to know if pos is given
+        #as a function that returns a pos
+        #or if pos is a tuple containing (x, y)
+        if from_cursor:
+            pos = pos()
+
+        obj = self.make_map_obj(pos, obj_type, obj_subtype)
+
+        if self.layer.add_if_not_intersecting(obj): #successful placement
+            if self.layer.batch != None: #headless layers aren't drawn
+                obj.place(self.layer.batch)
+            return True
+        return False
+
+    def make_map_obj(self, pos, obj_type, obj_subtype = None,
+                     alpha = False, alpha_value = None, from_cursor = False):
+        if from_cursor: #True means pos is given as a method (cursor.get_pos)
+            pos = pos()
+
+        #Colors below are copied in case the alpha value must be changed.
+        #Object type is hadnled on case bases, and subtypes are handled
+        #within parent types. Alpha values are handled within object types
+        #since each object has differing color needs. ONE object is returned
+        #at the end.
+        #======================================================================#
+        #The alpha value is always at index 3 --> [r, g, b, a]
+        alpha_index = 3
+
+        #Tree handling
+        #----------------------------------------------------------------------#
+        if obj_type == "Tree":
+            if obj_subtype == "Oak":
+                leaf_color = list(self.oak_tree_leaf_color)
+                trunk_color = list(self.oak_tree_trunk_color)
+
+                leafs = self.oak_tree_leaves
+                width = self.oak_tree_width * self.scale
+                height = self.oak_tree_height * self.scale
+
+            elif obj_subtype == "Spruce":
+                leaf_color = list(self.spruce_tree_leaf_color)
+                trunk_color = list(self.spruce_tree_trunk_color)
+
+                leafs = self.spruce_tree_leaves
+                width = self.spruce_tree_width * self.scale
+                height = self.spruce_tree_height * self.scale
+
+            if alpha:
+                leaf_color[alpha_index] = alpha_value
+                trunk_color[alpha_index] = alpha_value
+
+            obj = map_obj.Tree(pos, width, height,
+                               leaf_color, trunk_color, leafs)
+        #----------------------------------------------------------------------#
+
+        #Mountain handling
+        #----------------------------------------------------------------------#
+        elif obj_type == "Mountain":
+            rock_color = list(self.mountain_rock_color)
+            snow_color = list(self.mountain_snow_color)
+
+            width = self.mountain_width * self.scale
+            height = self.mountain_height * self.scale
+
+            snow = False
+            if obj_subtype == "Snowy":
+                snow = True
+
+            if alpha:
+                rock_color[alpha_index] = alpha_value
+                snow_color[alpha_index] = alpha_value
+
+            obj = map_obj.Mountain(pos, width, height,
+                                   rock_color, snow, snow_color)
+        #----------------------------------------------------------------------#
+
+        #Hill handling
+        #----------------------------------------------------------------------#
+        elif obj_type == "Hill":
+            hill_color = list(self.hill_color)
+
+            radius = self.hill_radius * self.scale
+
+            if alpha:
+                hill_color[alpha_index] = alpha_value
+
+            obj = map_obj.Hill(pos, radius, hill_color)
+        #----------------------------------------------------------------------#
+
+        #Lake handling
+        #----------------------------------------------------------------------#
+        elif obj_type == "Lake":
+            lake_color = list(self.lake_water_color)
+
+            radius = self.lake_radius * self.scale
+
+            if alpha:
+                lake_color[alpha_index] = alpha_value
+
+            obj = map_obj.Lake(pos, radius, lake_color)
+        #----------------------------------------------------------------------#
+
+        #House handling
+        #----------------------------------------------------------------------#
+        elif obj_type == "House":
+            wall_color = list(self.house_wall_color)
+            door_color = list(self.house_door_color)
+            roof_color = list(self.house_roof_color)
+
+            width = self.house_width * self.scale
+            height = self.house_height * self.scale
+
+            if alpha:
+                wall_color[alpha_index] = alpha_value
+                door_color[alpha_index] = alpha_value
+                roof_color[alpha_index] = alpha_value
+
+            obj = map_obj.House(pos, width, height,
+                                wall_color, door_color, roof_color)
+        #----------------------------------------------------------------------#
+        #======================================================================#
+
+        #One object returned always.
+        return obj
+
+    def make_save_string(self):
+        #One line per object (see load_from_string in maparoni-n-cheese.py for
+        #the format).
+        save_string = str()
+        for obj in self.layer.objects():
+            save_string += "\n" + obj.get_save_string()
+        return save_string
+
+class Cell_stats(object):
+    #How population went in one cell (see note 5).
+    def __init__(self, area, window = 40):
+        self.area = area
+        self.attempts = 0
+        self.placed = 0
+        self.rejected = 0
+        self.recent = collections.deque(maxlen = window) #last few (True/False)
+        self.recent_placed = 0 #how many of those were placed
+        self.done = False
+
+    def __repr__(self):
+        return (f"{self.attempts:>8}  {self.placed:>6}  {self.rejected:>8}  "
+                f"{self.acceptance_rate():.2f}  {self.density():>7.2f}")
+
+    def add(self, placed):
+        self.attempts += 1
+        if placed:
+            self.placed += 1
+        else:
+            self.rejected += 1
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_placed -= self.recent[0] #(about to be pushed out)
+        self.recent.append(placed)
+        self.recent_placed += placed
+
+    def recent_rate(self):
+        #Placed out of the last few attempts (1 until there have been enough
+        #attempts to tell).
+        if len(self.recent) < self.recent.maxlen:
+            return 1
+        return self.recent_placed / len(self.recent)
+
+    def acceptance_rate(self):
+        if self.attempts == 0:
+            return 0
+        return self.placed / self.attempts
+
+    def density(self):
+        #Objects per 100x100 area.
+        if self.area <= 0:
+            return 0
+        return self.placed / self.area * 100 ** 2
+
+class Headless_map_maker(Map_generator):
+    def __init__(self, width = 1200, height = 630,
+                 seeds_number = 30, seeds_padding = 100,
+                 rng_seed = None, cache_folder = None):
+        self.width = width
+        self.height = height
+        self.obj_setup()
+        self.voronoi_seeds_number = seeds_number
+        self.voronoi_seeds_padding = seeds_padding
+        self.voronoi_rng_seed = rng_seed
+        self.voronoi_cache_folder = cache_folder
+        self.layer_setup()
+
+    def layer_setup(self):
+        #Same as Map_maker's layer, but nothing is ever drawn.
+        self.layer_width = self.width
+        self.layer_height = self.height
+        self.layer_region_width = 200
+        self.layer_region_height = 200
+        self.layer_color = [112, 200,  20, 255]
+        self.layer_index = "regions" #or "quadtree" (see layer.py)
+
+        self.layer = layer.Layer(self.layer_width,
+                                 self.layer_height,
+                                 self.layer_color,
+                                 self.layer_region_width,
+                                 self.layer_region_height,
+                                 headless = True,
+                                 index = self.layer_index)
+
+def main():
+    parser = argparse.ArgumentParser(
+                description = "Make a random map without opening a window.")
+    parser.add_argument("output", help = "save file to write (.txt)")
+    parser.add_argument("--width", type = int, default = 1200)
+    parser.add_argument("--height", type = int, default = 630)
+    parser.add_argument("--seeds", type = int, default = 30)
+    parser.add_argument("--padding", type = int, default = 100)
+    parser.add_argument("--rng-seed", type = int, default = None,
+                        help = "same rng seed --> same map (default: random)")
+    parser.add_argument("--cache", default = None,
+                        help = "folder for caching solved diagrams")
+    parser.add_argument("--density", type = float, default = None,
+                        help = "objects per 100x100 to aim for in each cell")
+    parser.add_argument("--stats", action = "store_true",
+                        help = "print how population went in each cell")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    map_maker = Headless_map_maker(args.width, args.height,
+                                   args.seeds, args.padding,
+                                   args.rng_seed, args.cache)
+    map_maker.voronoi_population_density = args.density
+    map_maker.generate_map()
+    save_string = map_maker.make_save_string()
+    with open(args.output, "w") as f:
+        f.write(save_string)
+
+    print(f"{args.output}: {save_string.count(chr(10))} objects in "
+          f"{time.perf_counter() - start:.2f}s (rng seed {map_maker.rng_seed})")
+    if args.stats:
+        print(map_maker.population_report())
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import math
-import pyglet
-from pyglet.gl import GL_LINES, GL_TRIANGLES
 import shapes
 import random
 
+#pyglet is only imported where something is drawn so that map objects can be
+#made (and collided) without a display (see map_generator.py).
+
 class Map_obj(object):
     def __init__(self, pos, width, height):
         self.pos = pos
@@ -14,8 +15,11 @@ class Map_obj(object):
     def setup(self):
         self.components = list()
         self.make_components()
+        self.bounding_boxes = dict() #see get_bounding_box
+        self.bounding_circles = dict() #see get_bounding_circle
 
     def place(self, parent_batch):
+        from pyglet.gl import GL_TRIANGLES
         self.parent_batch = parent_batch
         points = list()
         colors = list()
@@ -45,11 +49,51 @@ class Map_obj(object):
                             intersects = True
         return intersects
 
+    def get_bounding_box(self, collision_only = True):
+        #(min_x, max_x, min_y, max_y) around the collision components (or all
+        #of them), or None if there aren't any. It's kept (and moved along
+        #with the object) until it's scaled.
+        if collision_only in self.bounding_boxes:
+            return self.bounding_boxes[collision_only]
+
+        boxes = [component.shape.get_maxs_mins()
+                 for component in self.components
+                 if component.for_collision or not collision_only]
+        bounding_box = None
+        if len(boxes) > 0:
+            bounding_box = (min(box[0] for box in boxes),
+                            max(box[1] for box in boxes),
+                            min(box[2] for box in boxes),
+                            max(box[3] for box in boxes))
+        self.bounding_boxes[collision_only] = bounding_box
+        return bounding_box
+
+    def get_bounding_circle(self, collision_only = True):
+        #((x, y), radius) of a circle around the bounding box (see
+        #get_bounding_box), or None. Also kept until it's scaled.
+        if collision_only in self.bounding_circles:
+            return self.bounding_circles[collision_only]
+
+        box = self.get_bounding_box(collision_only)
+        circle = None
+        if box != None:
+            (min_x, max_x, min_y, max_y) = box
+            center = ((min_x + max_x) / 2, (min_y + max_y) / 2)
+            circle = (center, math.hypot(max_x - min_x, max_y - min_y) / 2)
+        self.bounding_circles[collision_only] = circle
+        return circle
+
     def is_near(self, other):
-        #takes max dimension of either object and tests if their positions
-        #are closer than 2x that distance (since 1x may not encompass the other)
-        distance = max(self.height, other.height, self.width, other.width) * 2
-        return shapes.Line.point_to_point(self.pos, other.pos) < distance
+        #If the circles around their collision components touch (nothing
+        #can collide otherwise).
+        circle = self.get_bounding_circle()
+        other_circle = other.get_bounding_circle()
+        if circle == None or other_circle == None:
+            return False
+        (((x, y), radius), ((other_x, other_y), other_radius)) = (circle,
+                                                                  other_circle)
+        return ((x - other_x) ** 2 + (y - other_y) ** 2 <=
+                (radius + other_radius) ** 2)
 
     def draw(self):
         for component in self.components:
@@ -62,6 +106,7 @@ class Map_obj(object):
     def move(self, dx, dy):
         (x, y) = self.pos
         self.pos = (x + dx, y + dy)
+        self.move_bounds(dx, dy)
         for i in range(len(self.vertex_list.vertices)):
             if i % 2 == 0:
                 self.vertex_list.vertices[i] += dx
@@ -70,7 +115,20 @@ class Map_obj(object):
         for component in self.components:
             component.move(dx, dy)
 
+    def move_bounds(self, dx, dy):
+        #The bounding boxes and circles move right along with it.
+        for (key, box) in self.bounding_boxes.items():
+            if box != None:
+                self.bounding_boxes[key] = (box[0] + dx, box[1] + dx,
+                                            box[2] + dy, box[3] + dy)
+        for (key, circle) in self.bounding_circles.items():
+            if circle != None:
+                ((x, y), radius) = circle
+                self.bounding_circles[key] = ((x + dx, y + dy), radius)
+
     def scale(self, dsize):
+        self.bounding_boxes = dict()
+        self.bounding_circles = dict()
         for component in self.components:
             component.scale(dsize)
         points = list()
@@ -80,6 +138,7 @@ class Map_obj(object):
         self.vertex_list.vertices = points
 
     def migrate(self, parent_batch):
+        from pyglet.gl import GL_TRIANGLES
         old_parent_batch = self.parent_batch
         self.parent_batch = parent_batch
         old_parent_batch.migrate(self.vertex_list, GL_TRIANGLES, None, self.parent_batch)
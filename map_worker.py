@@ -0,0 +1,105 @@
+################################################################################
+#
+#   map_worker.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import multiprocessing
+import queue
+
+import map_generator
+
+#Some notes:
+#   1) Making a map without watching it all happens in one go, so doing that
+#      right in a button press freezes the window until it's done (a long time
+#      for a couple hundred seeds). Map_worker makes the map in another process
+#      with a Headless_map_maker (see map_generator.py) and sends back what it
+#      placed one cell at a time. Map_maker picks those up every clock tick and
+#      adds a batch of them to its layer, so the window keeps drawing the whole
+#      time (see receive_map in maparoni-n-cheese.py).
+#   2) It's a process and not a thread since only one thread can run python at
+#      a time, so solving in a thread would still make the window stutter.
+#   3) Messages sent back are tuples with a name first:
+#       -- ("progress", text, fraction) --> what it's doing and how far along
+#       -- ("objects", [(pos, obj_type), ...]) --> placed in one cell
+#       -- ("error", text) --> it broke (nothing else gets sent)
+#       -- ("done",)
+#   4) The worker only knows about its own (empty) layer, so the objects are
+#      still checked against the real one when they're added (for anything
+#      placed by hand in the meantime).
+
+class Map_worker(object):
+    def __init__(self, width, height, settings):
+        #settings are Map_generator's attributes (see get_settings).
+        self.queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target = make_map,
+                                               args = (width, height, settings,
+                                                       self.queue),
+                                               daemon = True)
+        self.process.start()
+        self.done = False
+
+    def poll(self):
+        #Every message sent since the last poll (see note 3).
+        messages = list()
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            messages.append(message)
+            if message[0] == "done" or message[0] == "error":
+                self.done = True
+
+        if not self.done and not self.process.is_alive() and self.queue.empty():
+            messages.append(("error", "worker stopped unexpectedly"))
+            self.done = True
+        return messages
+
+    def cancel(self):
+        #Stops right away (solving a diagram can't be stopped part way).
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.queue.close()
+        self.done = True
+
+class Worker_map_maker(map_generator.Headless_map_maker):
+    #Keeps track of what's placed so it can be sent back.
+    def place_map_obj(self, pos, obj_type):
+        placed = super().place_map_obj(pos, obj_type)
+        if placed:
+            self.placed.append((pos, list(obj_type)))
+        return placed
+
+def get_settings(map_generator_obj):
+    #Everything Map_generator.obj_setup sets (sizes, colors, scale, seeds...),
+    #copied from map_generator_obj so the worker makes the same map.
+    defaults = map_generator.Map_generator()
+    map_generator.Map_generator.obj_setup(defaults)
+    return {name: getattr(map_generator_obj, name) for name in vars(defaults)}
+
+def make_map(width, height, settings, results):
+    #Runs in the worker process.
+    try:
+        map_maker = Worker_map_maker(width, height)
+        for (name, value) in settings.items():
+            setattr(map_maker, name, value)
+        map_maker.placed = list()
+
+        results.put(("progress", "solving", 0))
+        map_maker.voronoi_setup()
+        map_maker.solve_voronoi()
+
+        map_maker.population_setup()
+        seeds = map_maker.voronoi.seeds
+        for (i, seed) in enumerate(seeds):
+            map_maker.populate_seed(seed)
+            results.put(("objects", map_maker.placed))
+            results.put(("progress", "populating", (i + 1) / len(seeds)))
+            map_maker.placed = list()
+    except Exception as e:
+        results.put(("error", repr(e)))
+        return
+    results.put(("done",))
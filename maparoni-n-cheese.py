@@ -5,7 +5,7 @@
 #
 ################################################################################
 
-import random
+import time
 
 import pyglet
 from pyglet.window import key
@@ -15,8 +15,9 @@ import cursor
 import fileio
 import gui
 import layer
+import map_generator
 import map_obj
-import voronoi
+import map_worker
 
 #Some notes before you run:
 #   1) Just about anything can be customized from the button order to the
@@ -26,7 +27,10 @@ import voronoi
 #      (2 of which are the only way to use certain features)
 #       --  s  --> changes whether or not to visualize random map generation
 #       -- del --> deletes a selected item
-#       -- esc --> sets cursor to use select mode
+#       --  c  --> prints which cell of the last random map is under the
+#                  cursor and what it's filled with
+#       -- esc --> sets cursor to use select mode (or stops a random map that's
+#                  being made in the background, see map_worker.py)
 #   3) There's already a note about this, but be careful when changing
 #      the number of seeds and the seed padding for map generation. It can take
 #      a long time to compute seeds over 60 or so (depending on your machine)
@@ -37,9 +41,11 @@ import voronoi
 #      load files that arent formatted/made for this program, ESPECIALLY
 #      if they aren't .txt files.
 
-class Map_maker(app.App):
+class Map_maker(app.App, map_generator.Map_generator):
     def __init__(self, width = 1200, height = 700):
         super().__init__(width, height)
+        self.map_worker = None #see worker_setup
+        self.voronoi = None #the last random map's diagram (see voronoi_setup)
         self.setup()
 
     #The following is consistent of setup functions. Most of them are called on
@@ -50,6 +56,7 @@ class Map_maker(app.App):
     ############################################################################
     def setup(self):
         self.clock_setup()
+        self.worker_setup()
         self.obj_setup()
         self.layer_setup()
         self.cursor_setup()
@@ -58,68 +65,31 @@ class Map_maker(app.App):
     def clock_setup(self):
         self.clock = pyglet.clock.get_default()
 
+    def worker_setup(self):
+        #A map being made in the background (see map_worker.py) would go into
+        #the old layer, so it's stopped.
+        self.cancel_background_map()
+
+        #How many of the objects it sends back get added each clock tick.
+        self.worker_batch_size = 100
+        self.worker_objects = list() #received but not added yet
+        self.worker_label = None #progress shown in the bottom left
+
     def obj_setup(self):
-        #These are all of the sets of arguments for "object_type" and
-        #"object_subtype" that can be passed into make_map_object to receive
-        #the specified object.
-        self.map_obj_types = [
-                            ["Tree", "Oak"],
-                            ["Tree", "Spruce"],
-                            ["Mountain", "Snowy"],
-                            ["Hill"],
-                            ["House"]
-                             ]
-
-        #These are the sets of objects that go in a given
-        #region of the voronoi diagram (random map generation).
-        self.voronoi_object_sets = [
-                            [ ["Tree", "Oak"], ["Mountain"] ],
-                            [ ["Tree", "Spruce"], ["Mountain", "Snowy"] ],
-                            [ ["Tree", "Oak"], ["House"] ],
-                            [ ["Tree", "Spruce"], ["House"] ],
-                            [ ["Hill"] ],
-                                   ]
-
-        #For scaling objects' sizes (see on_mouse_scroll).
-        self.scale = 1
-
-        #The following are parameters for creating the map objects. They can
-        #be easily changed to modify the look and colors of objects.
-        #Colors are ALWAYS a list of 4 integers (0-255) --> [r, g, b, a]
-        #======================================================================#
-        self.oak_tree_leaf_color =  [45, 112, 3, 255]
-        self.oak_tree_trunk_color = [112, 52, 3, 255]
-        self.oak_tree_leaves = 1
-        self.oak_tree_width = 15
-        self.oak_tree_height = 20
-
-        self.spruce_tree_leaf_color =  [30, 85, 25, 255]
-        self.spruce_tree_trunk_color = [95, 60,  0, 255]
-        self.spruce_tree_leaves = 2 #anything over 3 or 4 looks a little odd :P
-        self.spruce_tree_width = 10
-        self.spruce_tree_height = 20
-
-        self.mountain_rock_color = [112, 112, 112, 255]
-        self.mountain_snow_color = [255, 255, 255, 255]
-        self.mountain_width = 30
-        self.mountain_height = 40
-
-        self.hill_color = [15, 112, 26, 255]
-        self.hill_radius = 5
-
-        self.lake_water_color = [0, 0, 112, 255]
-        self.lake_radius = 10
-
-        self.house_wall_color = [200, 112, 70, 255]
-        self.house_door_color = [112, 70, 40, 255]
-        self.house_roof_color = [80, 70, 65, 255]
-        self.house_width = 10
-        self.house_height = 10
+        super().obj_setup() #(see map_generator.py)
+
+        #Solved diagrams are kept here so the same map can be made again
+        #quickly (see diagram_cache.py).
+        self.voronoi_cache_folder = "diagram cache"
 
         #If voronoi generation should be visible
         #(runs a little slower but looks really cool)
         #(see on_key_press for toggle)
         self.show_generation = True
+
+        #Milliseconds of solving/populating to do each frame while it's
+        #visualized. More is faster but the window updates less smoothly.
+        self.show_generation_budget = 10
         #======================================================================#
 
     def layer_setup(self):
@@ -133,11 +103,16 @@ class Map_maker(app.App):
         self.layer_grid_visibility = False #toggles with toggle_grid
         self.layer_color = [112, 200,  20, 255]
 
+        #How objects are kept track of: "regions" (the grid) or "quadtree",
+        #which splits up more where there are more objects (see layer.py).
+        self.layer_index = "regions"
+
         self.layer = layer.Layer(self.layer_width,
                                  self.layer_height,
                                  self.layer_color,
                                  self.layer_region_width,
-                                 self.layer_region_height)
+                                 self.layer_region_height,
+                                 index = self.layer_index)
 
     def cursor_setup(self):
         #Cursor is used for selcting/moving/placing objects by holding a 
@@ -326,25 +301,12 @@ class Map_maker(app.App):
                            self.gui_button_args)
 
     def voronoi_setup(self):
-        #Be aware that if the seed number is too large, it may take
-        #a very (very) long time to solve the voronoi diagram.
-        #Also note that if too many seeds exist with too high padding,
-        #a diagram may fail to be created.
-        self.voronoi_seeds_number = 30
-        self.voronoi_seeds_padding = 100
-
-        #To keep track attempts made during populatoin.
-        self.voronoi_population_attempt = 0
-        self.voronoi_population_attempts = 200 #(see populate_seed for use)
+        #The seed number/padding are set in obj_setup (see map_generator.py).
+        super().voronoi_setup()
 
         #These are used for visualizing the voronoi border generation.
         self.voronoi_gen_borders = None
         self.voronoi_gen_borders_color = [0, 0, 0, 255]
-
-        self.voronoi = voronoi.Voronoi(self.width,
-                                       self.layer_height,
-                                       self.voronoi_seeds_number, 
-                                       self.voronoi_seeds_padding)
     ############################################################################
 
     #The following are pyglet event handlers and consist of the core logic for
@@ -358,10 +320,14 @@ class Map_maker(app.App):
     def on_key_press(self, symbol, modifiers):
         if symbol == key.DELETE and self.cursor.type == "Select":
             self.cursor.delete_selected()
+        elif symbol == key.ESCAPE and self.map_worker != None:
+            self.cancel_background_map()
         elif symbol == key.ESCAPE:
             self.change_cursor_type(cursor.Cursor.empty_fn, None, "Default")
         elif symbol == key.S:
             self.show_generation = not self.show_generation
+        elif symbol == key.C:
+            self.print_cell_at_pos(self.cursor.get_pos())
 
     def on_mouse_motion(self, x, y, dx, dy):
         self.cursor.move(dx, dy)
@@ -408,6 +374,8 @@ class Map_maker(app.App):
         self.layer.draw()
         self.cursor.draw()
         self.gui.draw()
+        if self.worker_label != None:
+            self.worker_label.draw()
     ############################################################################
 
     #The following is for random map generation. It uses voronoi.py to place
@@ -420,6 +388,7 @@ class Map_maker(app.App):
 
         #Sets up a voronoi diagram of seeds on first call.
         if dt == None:
+            self.cancel_background_map() #only one at a time
             self.voronoi_setup()
 
         #Solves the diagram of seeds using Fortune's Algorithm (see voronoi.py).
@@ -433,7 +402,8 @@ class Map_maker(app.App):
             self.clock.schedule(self.generate_random_map)
 
         elif self.show_generation:
-            points = self.voronoi.solve_visually()
+            points = self.voronoi.solve_visually(
+                                        self.show_generation_budget / 1000)
 
             if points == None: #border generation is done
                 self.clock.unschedule(self.generate_random_map)
@@ -457,40 +427,57 @@ class Map_maker(app.App):
         #For not visual generation
         #----------------------------------------------------------------------#
         else:
-            self.voronoi.solve()
-
-            #Adds map objects to the diagram randomly.
-            self.populate_voronoi()
+            #Nothing is drawn until it's done, so the whole map is made in
+            #the background and added as it comes in (see map_worker.py).
+            self.background_generate_map()
         #----------------------------------------------------------------------#
 
-    # The following is for the non-visual population of the voronoi diagram
-    # (random map generation). It will cause the program to hang for a few
-    # moments (maybe minutes, depending on seed numbers).
+    #The following is for making a random map in another process without
+    #visualizing it (see map_worker.py). The window keeps drawing while it's
+    #made, and the objects are added a batch at a time as they come back.
     #==========================================================================#
-    def populate_voronoi(self):
-        for seed in self.voronoi.seeds:
-            #Each seed in a voronoi diagram has a polygonal shape around it.
-            polygon = seed.get_polygon()
-            seed.polygon = polygon
-
-            #Choose a set of objects to fill with. (defined in obj_setup)
-            seed.map_obj_set = random.choice(self.voronoi_object_sets)
-            self.populate_seed(seed)
-
-    def populate_seed(self, seed):
-        #Get a bounding rectangle of mins and maxs to try coordinates inside.
-        (min_x, max_x, min_y, max_y) = seed.polygon.get_maxs_mins()
-
-        #Try so many placements of random coordinates.
-        for _ in range(self.voronoi_population_attempts):
-            obj_type = random.choice(seed.map_obj_set) #pick an object from set
-
-            x = random.randrange(int(min_x), int(max_x) + 1) #+1 in case euqal
-            y = random.randrange(int(min_y), int(max_y) + 1) #+1 in case euqal
-            pos = (x, y)
-
-            if seed.polygon.contains_point(pos):
-                self.add_map_obj(pos, *obj_type) #*obj in case obj has a subtype
+    def background_generate_map(self):
+        settings = map_worker.get_settings(self)
+        settings["voronoi_rng_seed"] = self.rng_seed #(picked in voronoi_setup)
+        self.map_worker = map_worker.Map_worker(self.layer_width,
+                                                self.layer_height,
+                                                settings)
+        self.worker_objects = list()
+        self.worker_label = pyglet.text.Label("", x = 10, y = 10,
+                                              color = (0, 0, 0, 255))
+        self.update_worker_label("starting", 0)
+        self.clock.schedule(self.receive_map)
+
+    def receive_map(self, dt):
+        for message in self.map_worker.poll():
+            if message[0] == "objects":
+                self.worker_objects.extend(message[1])
+            elif message[0] == "progress":
+                self.update_worker_label(message[1], message[2])
+            elif message[0] == "error":
+                print(f"random map failed ({message[1]})")
+
+        #Only a batch per tick so drawing doesn't have to wait.
+        batch = self.worker_objects[:self.worker_batch_size]
+        del self.worker_objects[:self.worker_batch_size]
+        for (pos, obj_type) in batch:
+            self.add_map_obj(pos, *obj_type) #*obj in case of a subtype
+
+        if self.map_worker.done and len(self.worker_objects) == 0:
+            self.cancel_background_map() #(finished, just cleans up)
+
+    def update_worker_label(self, text, fraction):
+        self.worker_label.text = (f"Making map: {text} {fraction:.0%} "
+                                  f"(esc to stop)")
+
+    def cancel_background_map(self):
+        if self.map_worker == None:
+            return
+        self.clock.unschedule(self.receive_map)
+        self.map_worker.cancel()
+        self.map_worker = None
+        self.worker_objects = list()
+        self.worker_label = None
     #==========================================================================#
 
     # The following is for visualizing the generation of the random map
@@ -505,38 +492,39 @@ class Map_maker(app.App):
             #(a while/for loop pauses program --> no drawing)
             self.clock.schedule(self.visual_populate_voronoi)
 
-            for seed in self.voronoi.seeds:
-                #Each seed in a voronoi diagram has a polygonal shape around it.
-                polygon = seed.get_polygon()
-                seed.polygon = polygon
-
-                #Choose a set of objects to fill with. (defined in obj_setup)
-                seed.map_obj_set = random.choice(self.voronoi_object_sets)
+            #The edges found while watching can be a little off (see
+            #voronoi.py note 2), so the cells are made exactly for populating
+            #(and cached, unless the diagram came from the cache).
+            if self.voronoi.cell_vertices == None:
+                self.voronoi.build_cells()
+                self.cache_voronoi()
 
-        elif self.voronoi_population_attempt > self.voronoi_population_attempts:
-            #Tried enough populations. Stop it.
-            self.clock.unschedule(self.visual_populate_voronoi)
-            self.voronoi_population_attempt = 0 #reset attempts for future runs
+            #Polygons, object sets and stats for each seed (see
+            #map_generator.py).
+            self.population_setup()
 
         else:
-            for seed in self.voronoi.seeds:
-                self.visual_populate_seed(seed)
+            #One attempt in each cell that isn't done yet (see populate_step),
+            #over and over until this frame's time is used up.
+            start = time.perf_counter()
+            while self.show_generation:
+                populating = False
+                for seed in self.voronoi.seeds:
+                    if self.visual_populate_seed(seed):
+                        populating = True
+
+                if not populating: #every cell is done. Stop it.
+                    self.clock.unschedule(self.visual_populate_voronoi)
+                    break
 
-            self.voronoi_population_attempt += 1
+                if (time.perf_counter() - start >=
+                    self.show_generation_budget / 1000):
+                    break
 
     def visual_populate_seed(self, seed):
         if self.show_generation:
-            #Get a bounding rect of mins/maxs to try coordinates inside.
-            (min_x, max_x, min_y, max_y) = seed.polygon.get_maxs_mins()
-
-            obj_type = random.choice(seed.map_obj_set) #pick an object from set
-
-            x = random.randrange(int(min_x), int(max_x) + 1) #+1 in case euqal
-            y = random.randrange(int(min_y), int(max_y) + 1) #+1 in case euqal
-            pos = (x, y)
-
-            if seed.polygon.contains_point(pos):
-                self.add_map_obj(pos, *obj_type) #*obj in case obj has a subtype
+            return self.populate_step(seed)
+        return True #(paused, not done)
     #==========================================================================#
     ############################################################################
 
@@ -544,130 +532,6 @@ class Map_maker(app.App):
     #change states of things such as the cursor's functionality,
     #map clearing, and map obj creation/addition.
     ############################################################################
-    def add_map_obj(self, pos, obj_type, obj_subtype = None,
-                    from_cursor = False):
-        #From cursor is to know if pos is given
-        #as a function that returns a pos
-        #or if pos is a tuple containing (x, y)
-        if from_cursor:
-            pos = pos()
-
-        obj = self.make_map_obj(pos, obj_type, obj_subtype)
-
-        if self.layer.add_if_not_intersecting(obj): #successful placement
-            obj.place(self.layer.batch)
-
-    def make_map_obj(self, pos, obj_type, obj_subtype = None,
-                     alpha = False, alpha_value = None, from_cursor = False):
-        if from_cursor: #True means pos is given as a method (cursor.get_pos)
-            pos = pos()
-
-        #Colors below are copied in case the alpha value must be changed.
-        #Object type is hadnled on case bases, and subtypes are handled
-        #within parent types. Alpha values are handled within object types
-        #since each object has differing color needs. ONE object is returned
-        #at the end.
-        #======================================================================#
-        #The alpha value is always at index 3 --> [r, g, b, a]
-        alpha_index = 3
-
-        #Tree handling
-        #----------------------------------------------------------------------#
-        if obj_type == "Tree":
-            if obj_subtype == "Oak":
-                leaf_color = list(self.oak_tree_leaf_color)
-                trunk_color = list(self.oak_tree_trunk_color)
-
-                leafs = self.oak_tree_leaves
-                width = self.oak_tree_width * self.scale
-                height = self.oak_tree_height * self.scale
-
-            elif obj_subtype == "Spruce":
-                leaf_color = list(self.spruce_tree_leaf_color)
-                trunk_color = list(self.spruce_tree_trunk_color)
-
-                leafs = self.spruce_tree_leaves
-                width = self.spruce_tree_width * self.scale
-                height = self.spruce_tree_height * self.scale
-
-            if alpha:
-                leaf_color[alpha_index] = alpha_value
-                trunk_color[alpha_index] = alpha_value
-
-            obj = map_obj.Tree(pos, width, height,
-                               leaf_color, trunk_color, leafs)
-        #----------------------------------------------------------------------#
-
-        #Mountain handling
-        #----------------------------------------------------------------------#
-        elif obj_type == "Mountain":
-            rock_color = list(self.mountain_rock_color)
-            snow_color = list(self.mountain_snow_color)
-
-            width = self.mountain_width * self.scale
-            height = self.mountain_height * self.scale
-
-            snow = False
-            if obj_subtype == "Snowy":
-                snow = True
-
-            if alpha:
-                rock_color[alpha_index] = alpha_value
-                snow_color[alpha_index] = alpha_value
-
-            obj = map_obj.Mountain(pos, width, height,
-                                   rock_color, snow, snow_color)
-        #----------------------------------------------------------------------#
-
-        #Hill handling
-        #----------------------------------------------------------------------#
-        elif obj_type == "Hill":
-            hill_color = list(self.hill_color)
-
-            radius = self.hill_radius * self.scale
-
-            if alpha:
-                hill_color[alpha_index] = alpha_value
-
-            obj = map_obj.Hill(pos, radius, hill_color)
-        #----------------------------------------------------------------------#
-
-        #Lake handling
-        #----------------------------------------------------------------------#
-        elif obj_type == "Lake":
-            lake_color = list(self.lake_water_color)
-
-            radius = self.lake_radius * self.scale
-
-            if alpha:
-                lake_color[alpha_index] = alpha_value
-
-            obj = map_obj.Lake(pos, radius, lake_color)
-        #----------------------------------------------------------------------#
-
-        #House handling
-        #----------------------------------------------------------------------#
-        elif obj_type == "House":
-            wall_color = list(self.house_wall_color)
-            door_color = list(self.house_door_color)
-            roof_color = list(self.house_roof_color)
-
-            width = self.house_width * self.scale
-            height = self.house_height * self.scale
-
-            if alpha:
-                wall_color[alpha_index] = alpha_value
-                door_color[alpha_index] = alpha_value
-                roof_color[alpha_index] = alpha_value
-
-            obj = map_obj.House(pos, width, height,
-                                wall_color, door_color, roof_color)
-        #----------------------------------------------------------------------#
-        #======================================================================#
-
-        #One object returned always.
-        return obj
-
     def select_obj(self, pos, from_cursor = False): #called on a mouse press
         if from_cursor:
             pos = pos() #pos is given as self.cursor.get_pos
@@ -686,7 +550,21 @@ class Map_maker(app.App):
                 self.cursor.selected.migrate(self.layer.batch)
                 self.cursor.selected = None #remove from cursor
 
+    def print_cell_at_pos(self, pos):
+        #The cell is the one whose seed is nearest (see voronoi.py note 10).
+        if self.voronoi == None:
+            return
+        seed = self.voronoi.get_seed_at_pos(pos)
+        if seed == None:
+            return
+        map_obj_set = getattr(seed, "map_obj_set", None) #(population_setup)
+        if map_obj_set == None:
+            print(f"cell {seed.index}")
+        else:
+            print(f"cell {seed.index}: {map_obj_set}")
+
     def clear_map(self):
+        self.cancel_background_map()
         self.layer_setup() #layer setup will just re-make the layer and regions
 
     def update_cursor_img(self):
@@ -744,15 +622,7 @@ class Map_maker(app.App):
     #fileio.py to create a file dialog for picking a file to save/load.
     ############################################################################
     def get_save_string(self):
-        save_string = str()
-        seen_objs = set()
-        for region in self.layer.regions:
-            for obj in region.objects:
-                if obj not in seen_objs:
-                    string = obj.get_save_string()
-                    save_string += "\n" + string
-                seen_objs.add(obj)
-        fileio.save_file_string(save_string)
+        fileio.save_file_string(self.make_save_string())
 
     def load_from_string(self):
         self.clear_map()
@@ -833,6 +703,9 @@ class Map_maker(app.App):
             obj.place(self.layer.batch)
     ############################################################################
 
-map_maker = Map_maker()
-map_maker.set_caption("Map Maker")
-pyglet.app.run()
+#The worker process (see map_worker.py) can import this file on some systems,
+#so the window is only made when this is run directly.
+if __name__ == "__main__":
+    map_maker = Map_maker()
+    map_maker.set_caption("Map Maker")
+    pyglet.app.run()
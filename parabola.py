@@ -108,10 +108,12 @@ class Parabola(object):
                 b = -(2 * u * self_h + m)
                 c = u * self_h ** 2 + m * other_h + self_k - other_k
 
+                #The points are put right on the line (from the parabola, a
+                #horizontal border can come out a hair outside of itself).
                 x1 = (-b + math.sqrt(b ** 2 - 4 * (a * c))) / (2 * a)
-                y1 = self.output(x1)
+                y1 = m * (x1 - other_h) + other_k
                 x2 = (-b - math.sqrt(b ** 2 - 4 * (a * c))) / (2 * a)
-                y2 = self.output(x2)
+                y2 = m * (x2 - other_h) + other_k
 
                 p1 = (x1, y1)
                 p2 = (x2, y2)
@@ -125,6 +127,80 @@ class Parabola(object):
                 y = self.output(x)
                 return [(x, y)]
 
+    def interval_above(self, y):
+        #The (x_min, x_max) where this parabola is above y (it opens downward
+        #when the directrix is above the focus), or None if it never is.
+        p = (self.focus[1] - self.directrix) / 2
+        h = self.focus[0]
+        k = self.directrix + p
+        if k <= y:
+            return None
+        half_width = math.sqrt((y - k) * 4 * p)
+        return (h - half_width, h + half_width)
+
+    def is_covered(self, others, x_min, x_max):
+        #True if everywhere from x_min to x_max at least one of the other
+        #parabolas is at or above this one (they should all have the same
+        #directrix). Same equation as intersections, with
+        #self - other = a * x ** 2 + b * x + c
+        self_p = (self.focus[1] - self.directrix) / 2
+        self_h = self.focus[0]
+        self_k = self.directrix + self_p
+        u = (1 / (4 * self_p))
+
+        #This parabola can only be on top between low and high, and not in any
+        #of the gaps (where a wider parabola is above it).
+        low = x_min
+        high = x_max
+        gaps = list()
+        for other in others:
+            other_p = (other.focus[1] - other.directrix) / 2
+            other_h = other.focus[0]
+            other_k = other.directrix + other_p
+            v = (1 / (4 * other_p))
+
+            a = u - v
+            b = 2 * v * other_h - 2 * u * self_h
+            c = u * self_h ** 2 - v * other_h ** 2 + self_k - other_k
+
+            if a == 0: #same width, so they cross once (or never)
+                if b == 0:
+                    if c < 0:
+                        return True
+                elif b > 0:
+                    low = max(low, -c / b)
+                else:
+                    high = min(high, -c / b)
+            else:
+                discriminant = b ** 2 - 4 * (a * c)
+                if a < 0: #self is narrower, only on top between the roots
+                    if discriminant < 0:
+                        return True
+                    root = math.sqrt(discriminant)
+                    low = max(low, min((-b + root) / (2 * a),
+                                       (-b - root) / (2 * a)))
+                    high = min(high, max((-b + root) / (2 * a),
+                                         (-b - root) / (2 * a)))
+                elif discriminant > 0: #self is wider, under between the roots
+                    root = math.sqrt(discriminant)
+                    gaps.append((min((-b + root) / (2 * a),
+                                     (-b - root) / (2 * a)),
+                                 max((-b + root) / (2 * a),
+                                     (-b - root) / (2 * a))))
+
+            if low >= high:
+                return True
+
+        #Walk through the gaps from low to see if they cover up to high.
+        x = low
+        for (gap_min, gap_max) in sorted(gaps):
+            if gap_min > x:
+                return False
+            x = max(x, gap_max)
+            if x >= high:
+                return True
+        return x >= high
+
     def sample_points(self, samples, x_min, x_max, flattened = False):
         dx = (x_max - x_min) / samples
         x = x_min
@@ -0,0 +1,129 @@
+################################################################################
+#
+#   parabola_batch.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+try:
+    import numpy
+except ImportError: #only needed for batched voronoi solving
+    numpy = None
+
+#Note about Parabola_batch class:
+#   This is the same parabola as parabola.py (focus and directrix), but a whole
+#   set of them at once. Instead of a Parabola object per seed, the (p, h, k)
+#   values for every parabola are kept in arrays so that every pairwise
+#   intersection and every "is this point under a parabola" test can be done
+#   for all of them in one go:
+#       y = (1 / (4 * p)) * (x - h) ** 2 + k
+#   All of the parabolas share the same directrix (the sweepline).
+class Parabola_batch(object):
+    def __init__(self, foci, directrix):
+        foci = numpy.asarray(foci, dtype = float).reshape(-1, 2)
+        self.directrix = directrix
+        self.p = (foci[:, 1] - directrix) / 2
+        self.h = foci[:, 0]
+        self.k = directrix + self.p
+        with numpy.errstate(divide = "ignore"):
+            self.u = 1 / (4 * self.p)
+
+        self.floors = None #see get_floors
+
+    def __len__(self):
+        return len(self.h)
+
+    def outputs(self, x):
+        #Output of every parabola (columns) at every x (rows).
+        x = numpy.asarray(x, dtype = float)
+        return self.u * (x[:, None] - self.h) ** 2 + self.k
+
+    def pairwise_intersections(self):
+        #Solves every pair (i < j) of parabolas at once. Same quadratic as
+        #Parabola.intersections:
+        #(1 / (4 * ip)) * (x - ih) ** 2 + ik = (1 / (4 * jp)) * (x - jh) ** 2 + jk
+        #Returns the pair indices and both roots (x1 uses +sqrt, x2 uses -sqrt),
+        #leaving out pairs that don't intersect (just like the try/except does).
+        (i, j) = numpy.triu_indices(len(self), 1)
+        u = self.u[i]
+        v = self.u[j]
+        a = u - v
+        b = 2 * v * self.h[j] - 2 * u * self.h[i]
+        c = u * self.h[i] ** 2 - v * self.h[j] ** 2 + self.k[i] - self.k[j]
+        discriminant = b ** 2 - 4 * (a * c)
+
+        solvable = ((a != 0) & (discriminant >= 0) &
+                    numpy.isfinite(a) & numpy.isfinite(discriminant))
+        (i, j) = (i[solvable], j[solvable])
+        (a, b) = (a[solvable], b[solvable])
+        root = numpy.sqrt(discriminant[solvable])
+
+        x1 = (-b + root) / (2 * a)
+        x2 = (-b - root) / (2 * a)
+        y1 = self.u[i] * (x1 - self.h[i]) ** 2 + self.k[i]
+        y2 = self.u[i] * (x2 - self.h[i]) ** 2 + self.k[i]
+        return (i, j, x1, y1, x2, y2)
+
+    def horizontal_line_intersections(self, line_y):
+        #Same as Parabola.intersections with a slope 0 line at y = line_y.
+        a = self.u
+        b = -2 * self.u * self.h
+        c = self.u * self.h ** 2 + self.k - line_y
+        discriminant = b ** 2 - 4 * (a * c)
+
+        solvable = numpy.isfinite(discriminant) & (discriminant >= 0)
+        i = numpy.nonzero(solvable)[0]
+        root = numpy.sqrt(discriminant[solvable])
+
+        x1 = (-b[i] + root) / (2 * a[i])
+        x2 = (-b[i] - root) / (2 * a[i])
+        y1 = numpy.full(len(i), float(line_y)) #(see Parabola.intersections)
+        y2 = numpy.full(len(i), float(line_y))
+        return (i, x1, y1, x2, y2)
+
+    def vertical_line_intersections(self, line_x):
+        #Same as Parabola.intersections with a vertical line at x = line_x
+        #(one point per parabola, given as both roots).
+        i = numpy.nonzero(numpy.isfinite(self.u))[0]
+        x = numpy.full(len(i), float(line_x))
+        y = self.u[i] * (x - self.h[i]) ** 2 + self.k[i]
+        return (i, x, y, x, y)
+
+    def get_floors(self, width, samples):
+        #Floors only depend on the parabolas, so they're made once and kept.
+        if self.floors is None or len(self.floors) != samples:
+            sample_xs = numpy.linspace(0, width, samples + 1)
+            sample_ys = self.outputs(sample_xs)
+            self.floors = numpy.minimum(sample_ys[:-1],
+                                        sample_ys[1:]).max(axis = 1)
+        return self.floors
+
+    def points_under(self, x, y, width, samples = 512, chunk_size = 4096):
+        #Same test as Parabola.__gt__ for every parabola: a point is under if
+        #any parabola is at least 1 above it. Returns a boolean per point.
+        #
+        #Most points are nowhere near the top of the parabolas, so they're
+        #thrown out early. Every parabola is concave (opens downward), so
+        #between two sample xs it is never lower than the smaller of its two
+        #sample outputs. The largest of those is a floor for the highest
+        #parabola anywhere in that interval.
+        x = numpy.asarray(x, dtype = float)
+        y = numpy.asarray(y, dtype = float)
+        under = numpy.zeros(len(x), dtype = bool)
+        if len(self) == 0 or len(x) == 0:
+            return under
+
+        floors = self.get_floors(width, samples)
+
+        interval = numpy.clip((x / width * samples).astype(int), 0, samples - 1)
+        inside = (x >= 0) & (x <= width)
+        surely_under = inside & (floors[interval] - y >= 1)
+        under[surely_under] = True
+
+        #Whatever is left gets the exact test, a chunk at a time.
+        unsure = numpy.nonzero(~surely_under)[0]
+        for start in range(0, len(unsure), chunk_size):
+            indices = unsure[start:start + chunk_size]
+            outputs = self.outputs(x[indices])
+            under[indices] = ((outputs - y[indices, None]) >= 1).any(axis = 1)
+        return under
@@ -0,0 +1,306 @@
+################################################################################
+#
+#   poisson.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import math
+import random
+
+#Some notes:
+#   1) This is Bridson's algorithm for Poisson-disk sampling, described here:
+#           -- https://www.cs.ubc.ca/~rbridson/docs/bridson-siggraph07-poissondisk.pdf
+#      It fills a rectangle with points that are all at least radius apart,
+#      until no more will fit (it's "maximal").
+#   2) Points are kept in a background grid of cells that are radius / sqrt(2)
+#      wide, so each cell can hold at most one point. Checking whether a new
+#      point is too close to the others only has to look at the 5x5 cells
+#      around it, no matter how many points there are.
+#   3) If only a few points are needed, throw_darts is quicker. It just tries
+#      uniformly random points (using the same grid for checking) until there
+#      are enough, but it can run out of attempts before the rectangle is
+#      actually full.
+#   4) If integer is True, points are rounded to whole numbers before they're
+#      checked (the voronoi seeds have always been whole numbers).
+
+class Poisson_disk(object):
+    def __init__(self, min_x, min_y, max_x, max_y, radius,
+                 rng = random, attempts = 30, integer = False):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+        self.radius = radius
+        self.rng = rng
+        self.attempts = attempts #tries around each point before giving up on it
+        self.integer = integer
+
+        self.cell_size = radius / math.sqrt(2)
+        self.columns = int(math.ceil((max_x - min_x) / self.cell_size)) + 1
+        self.rows = int(math.ceil((max_y - min_y) / self.cell_size)) + 1
+        self.grid = [None] * (self.columns * self.rows)
+        self.points = list()
+
+    def sample(self):
+        if self.max_x < self.min_x or self.max_y < self.min_y:
+            return self.points
+
+        first = self.make_point(self.rng.uniform(self.min_x, self.max_x),
+                                self.rng.uniform(self.min_y, self.max_y))
+        self.add(first)
+        active = [first]
+
+        #Keep trying points in the ring (radius to 2 * radius) around a random
+        #active point. If none of the attempts fit, that point is done.
+        while len(active) > 0:
+            i = self.rng.randrange(len(active))
+            (x, y) = active[i]
+
+            found = False
+            for _ in range(self.attempts):
+                angle = self.rng.uniform(0, 2 * math.pi)
+                distance = self.radius * (1 + self.rng.random())
+                point = self.make_point(x + math.cos(angle) * distance,
+                                        y + math.sin(angle) * distance)
+                if self.is_valid(point):
+                    self.add(point)
+                    active.append(point)
+                    found = True
+                    break
+
+            if not found:
+                active[i] = active[-1] #swap-remove so it's O(1)
+                active.pop()
+
+        return self.points
+
+    def throw_darts(self, count, attempts):
+        while len(self.points) < count and attempts > 0:
+            attempts -= 1
+            point = self.make_point(self.rng.uniform(self.min_x, self.max_x),
+                                    self.rng.uniform(self.min_y, self.max_y))
+            if self.is_valid(point):
+                self.add(point)
+        return self.points
+
+    def make_point(self, x, y):
+        if self.integer:
+            return (int(round(x)), int(round(y)))
+        return (x, y)
+
+    def get_cell(self, point):
+        column = int((point[0] - self.min_x) / self.cell_size)
+        row = int((point[1] - self.min_y) / self.cell_size)
+        return (column, row)
+
+    def is_valid(self, point):
+        (x, y) = point
+        if not (self.min_x <= x <= self.max_x and
+                self.min_y <= y <= self.max_y):
+            return False
+
+        (column, row) = self.get_cell(point)
+        for other_row in range(max(row - 2, 0), min(row + 3, self.rows)):
+            start = other_row * self.columns
+            for other_column in range(max(column - 2, 0),
+                                      min(column + 3, self.columns)):
+                other = self.grid[start + other_column]
+                if (other != None and
+                    (other[0] - x) ** 2 + (other[1] - y) ** 2 <
+                    self.radius ** 2):
+                    return False
+        return True
+
+    def add(self, point):
+        (column, row) = self.get_cell(point)
+        self.grid[row * self.columns + column] = point
+        self.points.append(point)
+
+def max_points(width, height, radius):
+    #Upper limit on how many points can be at least radius apart in a width by
+    #height rectangle. Each point gets a circle of radius / 2 that no other
+    #circle overlaps, and those circles can't be packed any tighter than
+    #hexagonally (about 90.7% of the area, with the rectangle grown by
+    #radius / 2 on every side to fit circles centered on the edge).
+    if width < 0 or height < 0:
+        return 0
+    if radius <= 0:
+        return math.inf
+    return int((width + radius) * (height + radius) * 2 /
+               (math.sqrt(3) * radius ** 2))
+
+#Note about Footprint_grid class:
+#   This is the background grid from Poisson_disk, but every point has its own
+#   box around it (its "footprint", given as half its width and half its
+#   height). Two points fit together if their boxes don't overlap, so big
+#   things are spread out more than small ones. Cells are 2 * max_half_size
+#   wide, so only the 3x3 cells around a point can have anything too close to
+#   it. Cells hold lists since several small footprints can fit in one.
+class Footprint_grid(object):
+    def __init__(self, min_x, min_y, max_x, max_y, max_half_size):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.cell_size = max(2 * max_half_size, 1)
+        self.columns = int(math.ceil((max_x - min_x) / self.cell_size)) + 1
+        self.rows = int(math.ceil((max_y - min_y) / self.cell_size)) + 1
+        self.grid = [None] * (self.columns * self.rows)
+
+    def get_cell(self, point):
+        #Anything outside goes in the nearest cell on the edge.
+        column = int((point[0] - self.min_x) // self.cell_size)
+        row = int((point[1] - self.min_y) // self.cell_size)
+        return (min(max(column, 0), self.columns - 1),
+                min(max(row, 0), self.rows - 1))
+
+    def fits(self, point, half_size):
+        (x, y) = point
+        (half_width, half_height) = half_size
+        (column, row) = self.get_cell(point)
+        for other_row in range(max(row - 1, 0), min(row + 2, self.rows)):
+            start = other_row * self.columns
+            for other_column in range(max(column - 1, 0),
+                                      min(column + 2, self.columns)):
+                others = self.grid[start + other_column]
+                if others == None:
+                    continue
+                for (other_x, other_y, other_width, other_height) in others:
+                    #(touching counts, like Simple_polygon.intersects)
+                    if (abs(other_x - x) <= other_width + half_width and
+                        abs(other_y - y) <= other_height + half_height):
+                        return False
+        return True
+
+    def add(self, point, half_size):
+        (column, row) = self.get_cell(point)
+        i = row * self.columns + column
+        if self.grid[i] == None:
+            self.grid[i] = list()
+        self.grid[i].append((point[0], point[1], *half_size))
+
+    def remove(self, point, half_size):
+        (column, row) = self.get_cell(point)
+        self.grid[row * self.columns + column].remove((point[0], point[1],
+                                                       *half_size))
+
+#Note about Footprint_disk class:
+#   This is Bridson's algorithm (see Poisson_disk) for things that each have a
+#   footprint (see Footprint_grid), all kept in one grid so several areas can
+#   be filled next to each other. Every new point gets a kind picked by
+#   choose_kind (a function given the rng), and its footprint is
+#   footprints[kind]: ((dx, dy), (half_width, half_height)), the offset from
+#   the point to the middle of its box and the box's size. New points are
+#   tried in the ring around an active point where their boxes would be
+#   between touching and one box apart. inside is a function for clipping
+#   (points it returns False for are skipped). When every active point is
+#   done, a few random points are tried to start again somewhere that wasn't
+#   reached (like a spot cut off by what was already in the grid). keep can
+#   thin the points out afterward without leaving holes in the grid.
+class Footprint_disk(object):
+    def __init__(self, grid, min_x, min_y, max_x, max_y, footprints,
+                 choose_kind, inside = None, rng = random, attempts = 30,
+                 integer = False):
+        self.grid = grid
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+        self.footprints = footprints
+        self.choose_kind = choose_kind
+        self.inside = inside
+        self.rng = rng
+        self.attempts = attempts #tries around each point before giving up on it
+        self.integer = integer
+        self.points = list() #(point, kind)
+
+    def sample(self):
+        if self.max_x < self.min_x or self.max_y < self.min_y:
+            return self.points
+
+        active = list()
+        while True:
+            if len(active) == 0:
+                start = self.throw_dart()
+                if start == None:
+                    break
+                active.append(start)
+
+            i = self.rng.randrange(len(active))
+            found = None
+            for _ in range(self.attempts):
+                found = self.try_around(*active[i])
+                if found != None:
+                    break
+
+            if found != None:
+                active.append(found)
+            else:
+                active[i] = active[-1] #swap-remove so it's O(1)
+                active.pop()
+
+        return self.points
+
+    def keep(self, count):
+        #Only keeps count of the points (picked at random), and takes the rest
+        #back out of the grid so they don't block anything. The points are
+        #shuffled either way.
+        self.rng.shuffle(self.points)
+        for (point, kind) in self.points[count:]:
+            ((dx, dy), half_size) = self.footprints[kind]
+            self.grid.remove((point[0] + dx, point[1] + dy), half_size)
+        del self.points[count:]
+        return self.points
+
+    def throw_dart(self):
+        for _ in range(self.attempts):
+            kind = self.choose_kind(self.rng)
+            point = self.make_point(self.rng.uniform(self.min_x, self.max_x),
+                                    self.rng.uniform(self.min_y, self.max_y))
+            if self.try_add(point, kind):
+                return (point, kind)
+        return None
+
+    def try_around(self, point, kind):
+        ((dx, dy), (half_width, half_height)) = self.footprints[kind]
+        new_kind = self.choose_kind(self.rng)
+        ((new_dx, new_dy), (new_half_width, new_half_height)) = (
+                                                    self.footprints[new_kind])
+
+        #Distance between the boxes' middles where they'd just touch going
+        #this way (the rest of the ring is up to twice that).
+        angle = self.rng.uniform(0, 2 * math.pi)
+        (cos, sin) = (math.cos(angle), math.sin(angle))
+        touching = math.inf
+        if cos != 0:
+            touching = (half_width + new_half_width) / abs(cos)
+        if sin != 0:
+            touching = min(touching, (half_height + new_half_height) / abs(sin))
+        distance = touching * (1 + self.rng.random())
+
+        center_x = point[0] + dx + cos * distance
+        center_y = point[1] + dy + sin * distance
+        new_point = self.make_point(center_x - new_dx, center_y - new_dy)
+        if self.try_add(new_point, new_kind):
+            return (new_point, new_kind)
+        return None
+
+    def try_add(self, point, kind):
+        (x, y) = point
+        if not (self.min_x <= x <= self.max_x and
+                self.min_y <= y <= self.max_y):
+            return False
+        if self.inside != None and not self.inside(point):
+            return False
+
+        ((dx, dy), half_size) = self.footprints[kind]
+        center = (x + dx, y + dy)
+        if not self.grid.fits(center, half_size):
+            return False
+        self.grid.add(center, half_size)
+        self.points.append((point, kind))
+        return True
+
+    def make_point(self, x, y):
+        if self.integer:
+            return (int(round(x)), int(round(y)))
+        return (x, y)
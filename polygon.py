@@ -5,10 +5,16 @@
 #
 ################################################################################
 
+import array
 import math
 import vector
 import line
 
+try:
+    import numpy
+except ImportError: #contains_points/intersects_many are just slower without it
+    numpy = None
+
 # Note about Simple_polygon class:
 #   Points should be defined by angles in order going counter-clockwise around 
 #   the center of rotation (pos). Widths define the distance to each point from
@@ -20,53 +26,131 @@ import line
 #          (i.e the angle between 2 vectors at a point should not exceed 180
 #           degrees with respect to the main body of the polygon)
 #       2) The polygon should not "double" back on itself or overlap itself
+#
+#   The points are kept in one flat array of doubles (coordinates) as
+#   [x1, y1, x2, y2, ...]. Everything made from them (the points as tuples,
+#   triangles and lines for drawing, perimeter vectors) is only made the first
+#   time it's used and is kept in derived until the points change, since most
+#   map objects never need most of it.
+#
+#   The shape itself (the angles and widths around pos) is only worked out
+#   once, as offsets from pos (local_coordinates). Moving, scaling and
+#   rotating just change pos, scale_factor and turn, and the coordinates are
+#   made from those the next time they're used. Moving is just adding to every
+#   coordinate (no cos/sin), so dragging an object around costs almost
+#   nothing. angles and widths stay the way the shape was made.
+#
+#   Two (convex) polygons don't intersect if and only if one of them has an
+#   edge with all of the other's points outside of it (the separating axis
+#   theorem, checking the edges' normals). Unlike checking if either one has a
+#   point inside the other, that also catches shapes crossing each other like
+#   a plus sign. Their bounding boxes are checked first since that's quick.
+#
+#   The bounding box (get_maxs_mins) is kept with everything else made from
+#   the points, and is just moved along when the polygon is moved. The
+#   bounding circle (get_bounding_circle) is around pos, so only scaling
+#   changes its size.
 class Simple_polygon(object):
     def __init__(self, pos, angles, widths, radians = True, rotation = 0):
         self.pos = pos #pos defines the center of rotation of the polygon
         self.radians = radians
         self.angles = tuple(angles) #contains the angles to generate points
         self.widths = tuple(widths) #contains the distances to each point
-        self.radians = radians
         self.rotation = rotation
         self.setup()
     
     def setup(self):
-        self.generate_points()
-        self.generate_trianglular_points()
-        self.generate_lines_points()
-        self.generate_perimeter_vectors()
+        self.generate_local_coordinates()
+        self.scale_factor = 1
+        self.turn = 0 #rotation since it was made (same units as angles)
+        self.derived = dict()
         self.rotate(self.rotation)
 
-    def generate_points(self):
-        self.points = list()
-        self.flattened_points = list()
+    #The following are made from coordinates when they're first used
+    #(see above).
+    @property
+    def coordinates(self):
+        return self.get_derived("coordinates", self.generate_coordinates)
+
+    @property
+    def points(self):
+        return self.get_derived("points", self.generate_tuple_points)
+
+    @property
+    def flattened_points(self):
+        return self.get_derived("flattened points", self.coordinates.tolist)
+
+    @property
+    def triangular_points(self):
+        return self.get_derived("triangular points",
+                                self.generate_trianglular_points)
+
+    @property
+    def lines_points(self):
+        return self.get_derived("lines points", self.generate_lines_points)
+
+    @property
+    def vectors(self):
+        return self.get_derived("vectors", self.generate_perimeter_vectors)
+
+    def get_derived(self, name, generate):
+        if name not in self.derived:
+            self.derived[name] = generate()
+        return self.derived[name]
+
+    def generate_local_coordinates(self):
+        self.local_coordinates = array.array("d")
         for i in range(len(self.angles)):
             angle = self.angles[i]
             if not self.radians:
                 angle = math.radians(angle)
-            dx = math.cos(angle) * self.widths[i]
-            dy = math.sin(angle) * self.widths[i]
-            x = self.pos[0] + dx
-            y = self.pos[1] + dy
-            point = (x, y)
-            self.points.append(point)
-            self.flattened_points.extend([x, y])
+            self.local_coordinates.append(math.cos(angle) * self.widths[i])
+            self.local_coordinates.append(math.sin(angle) * self.widths[i])
+        self.local_radius = max([abs(width) for width in self.widths],
+                                default = 0)
+
+    def generate_coordinates(self):
+        (x, y) = self.pos
+        local = self.local_coordinates
+        coordinates = array.array("d", local)
+        if self.scale_factor == 1 and self.turn == 0: #just moved
+            for k in range(0, len(coordinates), 2):
+                coordinates[k] += x
+                coordinates[k + 1] += y
+            return coordinates
+
+        turn = self.turn
+        if not self.radians:
+            turn = math.radians(turn)
+        cos = math.cos(turn) * self.scale_factor
+        sin = math.sin(turn) * self.scale_factor
+        for k in range(0, len(coordinates), 2):
+            coordinates[k] = local[k] * cos - local[k + 1] * sin + x
+            coordinates[k + 1] = local[k] * sin + local[k + 1] * cos + y
+        return coordinates
+
+    def generate_tuple_points(self):
+        coordinates = self.coordinates
+        return [(coordinates[k], coordinates[k + 1])
+                for k in range(0, len(coordinates), 2)]
 
     def generate_trianglular_points(self): #for drawing the shape in triangles
-        self.triangular_points = list()
+        triangular_points = list()
         (x0, y0) = self.points[0]
         for i in range(1, len(self.points) - 1):
             (x1, y1) = self.points[i]
             (x2, y2) = self.points[i + 1]
-            self.triangular_points.extend([x0, y0, x1, y1, x2, y2])
+            triangular_points.extend([x0, y0, x1, y1, x2, y2])
+        return triangular_points
 
     def generate_lines_points(self): #for drawing the shape in line loops
-        self.lines_points = list()
+        lines_points = list()
         for i in range(len(self.points)):
             j = i - 1
             (x1, y1) = self.points[i]
             (x2, y2) = self.points[j]
-            self.lines_points.extend([x1, y1, x2, y2])
+            lines_points.extend([x1, y1, x2, y2])
+        return lines_points
 
     #generate the vectors from point to point around the perimeter
     def generate_perimeter_vectors(self):
@@ -81,43 +165,136 @@ class Simple_polygon(object):
             dy = point2[1] - point1[1]
             direction = (dx, dy)
             vectors += [vector.Vector(point1, direction)]
-        self.vectors = tuple(vectors)
+        return tuple(vectors)
 
     def scale(self, dwidth):
-        dwidth = 2 ** dwidth
-        widths = list()
-        for width in self.widths:
-            width *= dwidth
-            widths.append(width)
-        self.widths = tuple(widths)
-        self.setup()
+        self.scale_factor *= 2 ** dwidth
+        self.derived = dict()
 
     def intersects(self, other):
-        for point in other.points:
-            if self.contains_point(point):
+        #See above. Touching counts as intersecting.
+        if not boxes_overlap(self.get_maxs_mins(), other.get_maxs_mins()):
+            return False
+        return not (self.separates(other) or other.separates(self))
+
+    def intersects_many(self, others):
+        #True if this polygon intersects any of others. All of the bounding
+        #boxes are checked at once, and the ones that touch get the full test
+        #(in order, stopping at the first hit).
+        box = self.get_maxs_mins()
+        if numpy != None and len(others) > 16: #(not worth it for a few)
+            boxes = [other.get_maxs_mins() for other in others]
+            (min_x, max_x, min_y, max_y) = numpy.array(boxes, dtype = float).T
+            touching = numpy.flatnonzero((min_x <= box[1]) & (box[0] <= max_x) &
+                                         (min_y <= box[3]) & (box[2] <= max_y))
+            others = [others[i] for i in touching.tolist()]
+        else:
+            others = [other for other in others
+                      if boxes_overlap(box, other.get_maxs_mins())]
+        for other in others:
+            if not (self.separates(other) or other.separates(self)):
                 return True
-        for point in self.points:
-            if other.contains_point(point):
+        return False
+
+    def separates(self, other):
+        #True if one of this polygon's edges has all of other's points
+        #outside of it (see above).
+        coordinates = self.coordinates
+        other_coordinates = other.coordinates
+        orientation = self.get_orientation()
+        x1 = coordinates[-2]
+        y1 = coordinates[-1]
+        for k in range(0, len(coordinates), 2):
+            x2 = coordinates[k]
+            y2 = coordinates[k + 1]
+            dx = x2 - x1
+            dy = y2 - y1
+            tolerance = 1e-7 * (abs(dx) + abs(dy))
+            for j in range(0, len(other_coordinates), 2):
+                cross = (dx * (other_coordinates[j + 1] - y1) -
+                         dy * (other_coordinates[j] - x1))
+                if cross * orientation >= -tolerance: #not outside
+                    break
+            else:
                 return True
+            x1 = x2
+            y1 = y2
         return False
 
+    def get_orientation(self):
+        return self.get_derived("orientation", self.generate_orientation)
+
+    def generate_orientation(self):
+        #1 if the points go counter-clockwise and -1 if they go clockwise
+        #(from the sign of the area).
+        coordinates = self.coordinates
+        area = 0
+        x1 = coordinates[-2]
+        y1 = coordinates[-1]
+        for k in range(0, len(coordinates), 2):
+            x2 = coordinates[k]
+            y2 = coordinates[k + 1]
+            area += x1 * y2 - x2 * y1
+            x1 = x2
+            y1 = y2
+        if area < 0:
+            return -1
+        return 1
+
     def contains_point(self, point):
-        for i in range(len(self.vectors)):
-            j = i - 1
-            v = self.vectors[i]
-            direction_to_point = (point[0] - v.beginning_point[0],
-                                  point[1] - v.beginning_point[1])
-            vector_to_point = vector.Vector(v.beginning_point,
-                                            direction_to_point)
-            previous_vector = self.vectors[j] #negative index when i = 0
-            angle = v.angle_to(vector_to_point)
-            angle_to_previous = v.angle_to(previous_vector)
-            if angle > angle_to_previous:
-                return False
-            elif angle == angle_to_previous and not v.contains_point(point):
-                return False
+        #The point is inside if it's on the same side of every edge (the
+        #cross product of the edge and edge start --> point never changes
+        #sign). On an edge counts as inside (within about 1e-7).
+        (x, y) = point
+        coordinates = self.coordinates
+        x1 = coordinates[-2]
+        y1 = coordinates[-1]
+        side = 0
+        for k in range(0, len(coordinates), 2):
+            x2 = coordinates[k]
+            y2 = coordinates[k + 1]
+            dx = x2 - x1
+            dy = y2 - y1
+            cross = dx * (y - y1) - dy * (x - x1)
+            tolerance = 1e-7 * (abs(dx) + abs(dy))
+            if cross > tolerance:
+                if side < 0:
+                    return False
+                side = 1
+            elif cross < -tolerance:
+                if side > 0:
+                    return False
+                side = -1
+            x1 = x2
+            y1 = y2
         return True
 
+    def contains_points(self, points):
+        #contains_point for a batch of points (a list of True/False).
+        if numpy == None or len(points) == 0:
+            return [self.contains_point(point) for point in points]
+
+        points = numpy.asarray(points, dtype = float)
+        x = points[:, 0]
+        y = points[:, 1]
+        left = numpy.zeros(len(points), dtype = bool)
+        right = numpy.zeros(len(points), dtype = bool)
+        coordinates = self.coordinates
+        x1 = coordinates[-2]
+        y1 = coordinates[-1]
+        for k in range(0, len(coordinates), 2):
+            x2 = coordinates[k]
+            y2 = coordinates[k + 1]
+            dx = x2 - x1
+            dy = y2 - y1
+            cross = dx * (y - y1) - dy * (x - x1)
+            tolerance = 1e-7 * (abs(dx) + abs(dy))
+            left |= cross > tolerance
+            right |= cross < -tolerance
+            x1 = x2
+            y1 = y2
+        return (~(left & right)).tolist()
+
     def intersections(self, other):
         intersections = list()
         if isinstance(other, Simple_polygon):
@@ -134,31 +311,37 @@ class Simple_polygon(object):
         return intersections
 
     def rotate(self, dangle):
-        rotated_angles = list()
-        for angle in self.angles:
-            rotated_angles.append(angle+dangle)
-        self.angles = tuple(rotated_angles)
-        self.generate_points()
-        self.generate_trianglular_points()
-        self.generate_lines_points()
-        self.generate_perimeter_vectors()
+        if dangle == 0:
+            return
+        self.turn += dangle
+        self.derived = dict()
     
     def move(self, dx, dy):
         (x, y) = self.pos
         self.pos = (x + dx, y + dy)
-        self.setup()
+
+        #Everything else is made again (from pos) when it's needed.
+        box = self.derived.get("box")
+        self.derived = dict()
+        if box != None and box[0] != None:
+            self.derived["box"] = (box[0] + dx, box[1] + dx,
+                                   box[2] + dy, box[3] + dy)
 
     def get_maxs_mins(self):
-        max_x = max_y = None
-        min_x = min_y = None
-        for point in self.points:
-            (x, y) = point
-            if max_x == None or x > max_x:
-                max_x = x
-            if min_x == None or x < min_x:
-                min_x = x
-            if max_y == None or y > max_y:
-                max_y = y
-            if min_y == None or y < min_y:
-                min_y = y
-        return (min_x, max_x, min_y, max_y)
\ No newline at end of file
+        return self.get_derived("box", self.generate_maxs_mins)
+
+    def generate_maxs_mins(self):
+        if len(self.coordinates) == 0:
+            return (None, None, None, None)
+        xs = self.coordinates[0::2]
+        ys = self.coordinates[1::2]
+        return (min(xs), max(xs), min(ys), max(ys))
+
+    def get_bounding_circle(self):
+        #(center, radius) of a circle that the whole polygon is inside of.
+        return (self.pos, self.local_radius * self.scale_factor)
+
+def boxes_overlap(box, other_box):
+    #Boxes are (min_x, max_x, min_y, max_y) like get_maxs_mins.
+    return (box[0] <= other_box[1] and other_box[0] <= box[1] and
+            box[2] <= other_box[3] and other_box[2] <= box[3])
\ No newline at end of file
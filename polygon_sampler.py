@@ -0,0 +1,94 @@
+################################################################################
+#
+#   polygon_sampler.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import random
+
+try:
+    import numpy
+except ImportError: #it's just slower without it
+    numpy = None
+
+#Some notes:
+#   1) This picks random points that are always inside a convex polygon (like
+#      a voronoi cell) instead of picking them in its bounding box and throwing
+#      out the ones that miss. The polygon is split into a fan of triangles
+#      from its first point (the same triangles it's drawn with), a triangle
+#      is picked with odds by its area, and then a point is picked inside that
+#      triangle. Every part of the polygon is equally likely.
+#   2) A point inside a triangle (a, b, c) is a + r1 * (b - a) + r2 * (c - a)
+#      for random r1 and r2 in [0, 1). If r1 + r2 > 1 that's in the other half
+#      of the parallelogram, so it's flipped back with r1 = 1 - r1 and
+#      r2 = 1 - r2.
+#   3) If numpy is installed, a whole batch of points is made at once. Its
+#      random numbers come from rng too, so the same rng still gives the same
+#      points (but not the same ones as without numpy).
+
+class Polygon_sampler(object):
+    def __init__(self, points, rng = random):
+        self.points = [tuple(point) for point in points]
+        self.rng = rng
+
+        #Fan triangles and their areas (see note 1).
+        self.triangles = list()
+        self.cumulative_areas = list()
+        self.area = 0
+        if len(self.points) >= 3:
+            (ax, ay) = self.points[0]
+            for i in range(1, len(self.points) - 1):
+                (bx, by) = self.points[i]
+                (cx, cy) = self.points[i + 1]
+                area = abs((bx - ax) * (cy - ay) - (by - ay) * (cx - ax)) / 2
+                self.area += area
+                self.triangles.append((ax, ay, bx, by, cx, cy))
+                self.cumulative_areas.append(self.area)
+
+        self.arrays = None #see sample_batch
+
+    def sample(self, count):
+        #Returns count (x, y) points inside the polygon (none if it's empty).
+        if self.area <= 0 or count <= 0:
+            return [ ]
+        if numpy != None:
+            return self.sample_batch(count)
+
+        points = list()
+        indices = self.rng.choices(range(len(self.triangles)),
+                                   cum_weights = self.cumulative_areas,
+                                   k = count)
+        for i in indices:
+            (ax, ay, bx, by, cx, cy) = self.triangles[i]
+            r1 = self.rng.random()
+            r2 = self.rng.random()
+            if r1 + r2 > 1: #flip back into the triangle (see note 2)
+                r1 = 1 - r1
+                r2 = 1 - r2
+            points.append((ax + r1 * (bx - ax) + r2 * (cx - ax),
+                           ay + r1 * (by - ay) + r2 * (cy - ay)))
+        return points
+
+    def sample_batch(self, count):
+        #Same as sample but all at once with numpy.
+        if self.arrays == None:
+            self.arrays = (numpy.array(self.triangles, dtype = float),
+                           numpy.array(self.cumulative_areas, dtype = float))
+        (triangles, cumulative_areas) = self.arrays
+
+        generator = numpy.random.default_rng(self.rng.getrandbits(64))
+        picks = generator.random(count) * self.area
+        indices = numpy.searchsorted(cumulative_areas, picks, side = "right")
+        indices = numpy.minimum(indices, len(triangles) - 1)
+        (ax, ay, bx, by, cx, cy) = triangles[indices].T
+
+        r1 = generator.random(count)
+        r2 = generator.random(count)
+        flip = r1 + r2 > 1
+        r1[flip] = 1 - r1[flip]
+        r2[flip] = 1 - r2[flip]
+
+        x = ax + r1 * (bx - ax) + r2 * (cx - ax)
+        y = ay + r1 * (by - ay) + r2 * (cy - ay)
+        return list(zip(x.tolist(), y.tolist()))
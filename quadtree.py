@@ -0,0 +1,219 @@
+################################################################################
+#
+#   quadtree.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import heapq
+
+#Some notes:
+#   1) This keeps things (map objects) by their bounding boxes so the ones in
+#      or near some spot can be found without looking at everything. Boxes are
+#      (min_x, max_x, min_y, max_y) like Simple_polygon.get_maxs_mins.
+#   2) Every node covers a rectangle. Once a node has more than capacity
+#      things in it, it splits into four quarters and everything that fits
+#      completely inside one of the quarters moves down into it. Things that
+#      cross the lines between quarters stay in the node. So busy parts of the
+#      map get split up finely and empty parts stay as one big node, unlike a
+#      grid of fixed regions.
+#   3) When things are removed and a node (with everything under it) is down
+#      to capacity things or less, its quarters are merged back into it.
+#   4) Things outside of the root's rectangle are kept in the root.
+
+class Quadtree(object):
+    def __init__(self, min_x, max_x, min_y, max_y, capacity = 8,
+                 max_depth = 10):
+        self.capacity = capacity
+        self.max_depth = max_depth
+        self.root = Quadtree_node((min_x, max_x, min_y, max_y), 0, None)
+        self.item_nodes = dict() #item --> node it's in
+
+    def __len__(self):
+        return len(self.item_nodes)
+
+    def __iter__(self):
+        return iter(self.item_nodes)
+
+    def __contains__(self, item):
+        return item in self.item_nodes
+
+    def insert(self, item, box):
+        node = self.root
+        while True:
+            node.count += 1
+            if node.children == None:
+                break
+            child = node.get_child(box)
+            if child == None: #crosses the quarters' lines (see note 2)
+                break
+            node = child
+
+        node.items[item] = box
+        self.item_nodes[item] = node
+        if (node.children == None and len(node.items) > self.capacity and
+            node.depth < self.max_depth):
+            self.split(node)
+
+    def split(self, node):
+        node.make_children()
+        for (item, box) in list(node.items.items()):
+            child = node.get_child(box)
+            if child != None:
+                del node.items[item]
+                child.items[item] = box
+                child.count += 1
+                self.item_nodes[item] = child
+
+        #Everything might have gone into the same quarter.
+        for child in node.children:
+            if (len(child.items) > self.capacity and
+                child.depth < self.max_depth):
+                self.split(child)
+
+    def remove(self, item):
+        node = self.item_nodes.pop(item, None)
+        if node == None:
+            return False
+        del node.items[item]
+
+        #Counts go down all the way up, and the highest node that's small
+        #enough again gets merged (see note 3).
+        merge_node = None
+        while node != None:
+            node.count -= 1
+            if node.children != None and node.count <= self.capacity:
+                merge_node = node
+            node = node.parent
+        if merge_node != None:
+            self.merge(merge_node)
+        return True
+
+    def merge(self, node):
+        for (item, box) in self.get_subtree_items(node):
+            node.items[item] = box
+            self.item_nodes[item] = node
+        node.children = None
+
+    def get_subtree_items(self, node):
+        items = list()
+        for child in node.children:
+            items.extend(child.items.items())
+            if child.children != None:
+                items.extend(self.get_subtree_items(child))
+        return items
+
+    def move(self, item, box):
+        #Same as removing and inserting it again, but nothing changes if it's
+        #still in the same node.
+        node = self.item_nodes.get(item)
+        if (node != None and node.contains_box(box) and
+            (node.children == None or node.get_child(box) == None)):
+            node.items[item] = box
+            return
+        self.remove(item)
+        self.insert(item, box)
+
+    def query_box(self, box):
+        #Every item whose box overlaps box.
+        found = list()
+        nodes = [self.root]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            for (item, item_box) in node.items.items():
+                if boxes_overlap(box, item_box):
+                    found.append(item)
+            if node.children != None:
+                for child in node.children:
+                    if child.count > 0 and boxes_overlap(box, child.box):
+                        nodes.append(child)
+        return found
+
+    def query_point(self, point):
+        #Every item whose box has point in it.
+        (x, y) = point
+        return self.query_box((x, x, y, y))
+
+    def nearest(self, point, accept = None):
+        #The item whose box is closest to point (0 if it's inside). accept
+        #can be a function to skip items it returns False for.
+        (x, y) = point
+        heap = [(0, 0, self.root)] #(distance, tiebreak, node)
+        best = None
+        best_distance = None
+        tiebreak = 1
+        while len(heap) > 0:
+            (distance, _, node) = heapq.heappop(heap)
+            if best_distance != None and distance > best_distance:
+                break #nothing left can be closer
+
+            for (item, box) in node.items.items():
+                item_distance = box_distance(box, x, y)
+                if ((best_distance == None or item_distance < best_distance) and
+                    (accept == None or accept(item))):
+                    best = item
+                    best_distance = item_distance
+
+            if node.children != None:
+                for child in node.children:
+                    if child.count > 0:
+                        child_distance = box_distance(child.box, x, y)
+                        heapq.heappush(heap, (child_distance, tiebreak, child))
+                        tiebreak += 1
+        return best
+
+class Quadtree_node(object):
+    def __init__(self, box, depth, parent):
+        self.box = box
+        self.depth = depth
+        self.parent = parent
+        self.items = dict() #item --> box
+        self.children = None
+        self.count = 0 #items in this node and every node under it
+
+    def make_children(self):
+        (min_x, max_x, min_y, max_y) = self.box
+        middle_x = (min_x + max_x) / 2
+        middle_y = (min_y + max_y) / 2
+        self.middle = (middle_x, middle_y)
+        depth = self.depth + 1
+        self.children = [ #bottom left, bottom right, top left, top right
+                Quadtree_node((min_x, middle_x, min_y, middle_y), depth, self),
+                Quadtree_node((middle_x, max_x, min_y, middle_y), depth, self),
+                Quadtree_node((min_x, middle_x, middle_y, max_y), depth, self),
+                Quadtree_node((middle_x, max_x, middle_y, max_y), depth, self)]
+
+    def get_child(self, box):
+        #The quarter box is completely inside (None if it isn't in just one).
+        if not self.contains_box(box):
+            return None
+        (min_x, max_x, min_y, max_y) = box
+        (middle_x, middle_y) = self.middle
+        if max_x < middle_x:
+            column = 0
+        elif min_x > middle_x:
+            column = 1
+        else:
+            return None
+        if max_y < middle_y:
+            row = 0
+        elif min_y > middle_y:
+            row = 1
+        else:
+            return None
+        return self.children[row * 2 + column]
+
+    def contains_box(self, box):
+        (min_x, max_x, min_y, max_y) = box
+        return (self.box[0] <= min_x and max_x <= self.box[1] and
+                self.box[2] <= min_y and max_y <= self.box[3])
+
+def boxes_overlap(box, other_box):
+    return (box[0] <= other_box[1] and other_box[0] <= box[1] and
+            box[2] <= other_box[3] and other_box[2] <= box[3])
+
+def box_distance(box, x, y):
+    #Squared distance from (x, y) to the box (see kdtree.py note 4).
+    dx = max(box[0] - x, 0, x - box[1])
+    dy = max(box[2] - y, 0, y - box[3])
+    return dx ** 2 + dy ** 2
@@ -0,0 +1,92 @@
+################################################################################
+#
+#   test_polygon.py
+#   Code by: Casey Walker
+#
+################################################################################
+
+import math
+
+import polygon
+
+#Simple_polygon works its points out lazily from the moves, scales and turns
+#it's been given (see polygon.py). These check that against working every
+#point out straight from the angles and widths. Run with pytest.
+
+def eager_points(pos, angles, widths, radians, turn, scale_factor):
+    points = list()
+    for (angle, width) in zip(angles, widths):
+        angle += turn
+        if not radians:
+            angle = math.radians(angle)
+        width *= scale_factor
+        points.append((pos[0] + math.cos(angle) * width,
+                       pos[1] + math.sin(angle) * width))
+    return points
+
+def assert_points_close(points, other_points):
+    assert len(points) == len(other_points)
+    for ((x, y), (other_x, other_y)) in zip(points, other_points):
+        assert math.isclose(x, other_x, abs_tol = 1e-9)
+        assert math.isclose(y, other_y, abs_tol = 1e-9)
+
+def check_moved_scaled_turned(radians, rotation, angles, turn):
+    widths = [10, 14, 6, 20]
+    shape = polygon.Simple_polygon((50, 40), angles, widths,
+                                   radians = radians, rotation = rotation)
+    assert_points_close(shape.points,
+                        eager_points((50, 40), angles, widths, radians,
+                                     rotation, 1))
+
+    shape.move(15, -7)
+    shape.scale(1)
+    shape.rotate(turn)
+    shape.scale(-0.5)
+    shape.move(-3, 22)
+    expected = eager_points((62, 55), angles, widths, radians,
+                            rotation + turn, 2 ** 0.5)
+    assert_points_close(shape.points, expected)
+    assert_points_close(list(zip(shape.flattened_points[0::2],
+                                 shape.flattened_points[1::2])), expected)
+
+def test_rotated_polygon_radians():
+    check_moved_scaled_turned(True, 0.7, [0.1, 1.9, 3.3, 5], -1.2)
+
+def test_rotated_polygon_degrees():
+    check_moved_scaled_turned(False, 35, [10, 110, 190, 290], 80)
+
+def test_bounding_box_after_moves():
+    shape = polygon.Simple_polygon((0, 0), [0.3, 2, 4], [8, 5, 9],
+                                   rotation = 1.1)
+    shape.get_maxs_mins() #(cached, then moved along)
+    shape.move(4, 9)
+    shape.scale(0.5)
+    shape.move(-1, 2)
+    (xs, ys) = zip(*eager_points((3, 11), [0.3, 2, 4], [8, 5, 9], True,
+                                 1.1, 2 ** 0.5))
+    (min_x, max_x, min_y, max_y) = shape.get_maxs_mins()
+    assert math.isclose(min_x, min(xs)) and math.isclose(max_x, max(xs))
+    assert math.isclose(min_y, min(ys)) and math.isclose(max_y, max(ys))
+
+def scattered_polygons(count):
+    #A row of small triangles, some touching and some not.
+    return [polygon.Simple_polygon((i * 7, (i % 3) * 5), [0, 2, 4], [4, 4, 4])
+            for i in range(count)]
+
+def check_intersects_many(count):
+    others = scattered_polygons(count)
+    for (x, y) in [(3, 2), (40, 30), (100, 5), (-20, 0), (60, 11)]:
+        shape = polygon.Simple_polygon((x, y), [0.5, 2.5, 4.5], [5, 5, 5])
+        expected = any(shape.intersects(other) for other in others)
+        assert shape.intersects_many(others) == expected
+    assert not others[0].intersects_many(list())
+
+def test_intersects_many_few():
+    check_intersects_many(5)
+
+def test_intersects_many_lots():
+    check_intersects_many(40)
+
+def test_intersects_many_without_numpy(monkeypatch):
+    monkeypatch.setattr(polygon, "numpy", None)
+    check_intersects_many(40)
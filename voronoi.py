@@ -5,11 +5,17 @@
 #
 ################################################################################
 
+import array
 import math
 import random
-
-import pyglet
-
+import time
+
+import cells
+import dcel
+import fortune
+import kdtree
+import parabola_batch
+import poisson
 import shapes
 
 #Some notes:
@@ -40,76 +46,150 @@ import shapes
 #      will take a very long time (somewhere around 70 takes a couple minutes)
 #      depending on your machine. The seed padding will keep seeds from
 #      generating closely, but too large a padding will also keep the seeds
-#      from generating at all.
-#   3) There is a small WIP piece that would improve efficiency, but it has not
-#      been implemented at this time. It is the "complete" seed. Completed seeds
-#      will be ignored when testing the seeds for intersections (see test_seeds)
-#      and will save recourses. Again, this is WIP and is not yet implemented.
+#      from generating at all (it'll tell you how many seeds could fit).
+#   3) Seeds are "complete" once their cell is closed, meaning their parabola
+#      has been squeezed out from under the sweepline by the others (see
+#      retire_complete_seeds). Completed seeds are ignored when testing the
+#      seeds for intersections (see test_seeds) and when checking if an
+#      intersection is an edge, so only the "live" seeds cost anything. The
+#      number of live seeds after every step is kept in live_seed_counts.
+#   4) If the diagram doesn't need to be watched while it's made, use
+#      solve_quickly instead of solve. It uses the event-driven version of
+#      Fortune's Algorithm (see fortune.py) which skips straight from one
+#      change in the beachline to the next, so even 1000+ seeds take well under
+#      a second. It fills in the seeds the same way, so poll_points and
+#      get_polygon work the same afterward.
+#   5) If the diagram should still be watched but with more seeds, make it
+#      with batched = True (numpy must be installed). Every sweepline step
+#      then does all of the parabola intersections and "is it under a
+#      parabola" tests at once (see parabola_batch.py) instead of one pair at
+#      a time, so 100-200 seeds take seconds instead of minutes.
+#   6) Making the diagram with adaptive = True fixes most of note 2 without
+#      slowing anything down. Instead of always moving by sweepline_step, the
+#      sweepline jumps (up to sweepline_max_step at a time) to just before the
+#      next thing that changes: a seed being reached, an arc being squeezed
+#      out (a corner), or an edge running into or out of the border. Arcs
+#      outside of the border count too, since their edges come into it later
+#      (see upcoming_events). The edges then end almost exactly where they
+#      should. It also stops as soon as every cell is closed instead of going
+#      all the way to 1.75 * height.
+#   7) The seeds are placed with rng (anything with the same methods as the
+#      random module, like random.Random(seed)), so the same rng seed always
+#      gives the same diagram. A diagram that's already been solved can be
+#      made again without solving it: pass its points in and give it the cells
+#      from get_cells (see load_cells and diagram_cache.py).
+#   8) If only the cells are needed (not the edges as they're found), use
+#      build_cells. It makes each cell exactly by clipping the border against
+#      the seeds around it (see cells.py), so it never misses a corner like
+#      note 2 says the stepping can, and it's quick for thousands of seeds.
+#      The cells are kept as flat arrays in cell_vertices, and each seed's
+#      cell is used by poll_points and get_polygon from then on.
+#   9) For anything that needs to know which cells are next to each other
+#      (or the edge between them), make_dcel turns the cells into a half-edge
+#      structure with shared corners and edges plus the Delaunay triangulation
+#      (see dcel.py).
+#   10) The cell a point is in is the cell of the nearest seed, so
+#       get_seed_at_pos (and get_seed_indices_at for lots of points at once)
+#       finds it with a k-d tree of the seeds instead of checking cells'
+#       polygons one at a time (see kdtree.py). It works before the diagram
+#       is even solved.
 
 class Voronoi(object):
-    def __init__(self, width, height, number_of_seeds, seed_padding):
+    def __init__(self, width, height, number_of_seeds, seed_padding,
+                 batched = False, adaptive = False, rng = random,
+                 points = None):
         self.width = width
         self.height = height
         self.number_of_seeds = number_of_seeds
         self.seed_padding = seed_padding
+        self.rng = rng
+
+        if batched and parabola_batch.numpy == None:
+            raise Exception("numpy is needed for batched solving")
+        self.batched = batched #see test_seeds_batched
 
         self.sweepline_height = 0
         self.sweepline_step = .5
         self.sweepline = shapes.Line((0, self.sweepline_height), 0)
 
+        #For adaptive stepping (see next_sweepline_step).
+        self.adaptive = adaptive
+        self.sweepline_min_step = .01
+        self.sweepline_max_step = 10
+
+        #Seeds below the sweepline that aren't complete yet (see test_seeds).
+        self.live_seeds = list()
+        self.live_seed_counts = list()
+
+        self.cell_vertices = None #see build_cells
+        self.dcel = None #see make_dcel
+        self.kdtree = None #see make_kdtree
+
         try:
-            self.generate_seed_points()
+            if points == None:
+                self.generate_seed_points()
+            else: #already known (see note 7)
+                self.points = [tuple(point) for point in points]
             self.generate_seeds()
-        except:
-            raise Exception("Too many seeds and/or too much padding")
+        except Exception as error:
+            raise Exception(f"Too many seeds and/or too much padding ({error})")
         self.generate_borderlines()
 
-    #The following is the random seed generation. It will attempt to place
-    #all of the seeds, if it can't it will recurse to try again until it
-    #either succeeds or overflows. The last method is to generate the borders
-    #of the diagram.
+    #The following is the random seed generation. Seeds are placed with
+    #Poisson-disk sampling (see poisson.py) so that they're all at least
+    #padding away from each other and the border. If the seeds can't fit, it
+    #says so right away instead of trying over and over. The last method is to
+    #generate the borders of the diagram.
     ############################################################################
     def generate_seed_points(self):
-        points = list()
-
-        #So it doesn't get stuck in an infinite loop.
-        max_iterations = 5000
-        iterations = 0
-
-        #Below is the attempt to make all the desired points.
-        #----------------------------------------------------------------------#
-        #Tries to place seeds within the border of the diagram (adding padding)
-        #and padding distance awa from each other.
-        while (len(points) < self.number_of_seeds and
-               iterations < max_iterations):
-            iterations += 1
-
-            #Piacks random (x, y) point in the plane.
-            x = random.randrange(self.seed_padding,
-                                 (int(self.width - self.seed_padding)))
-            y = random.randrange(self.seed_padding,
-                                 (int(self.height - self.seed_padding)))
-            point = (x, y)
-
-
-            point_invalid = False
-            for other_point in points:
-                if isnear(point, other_point, self.seed_padding):
-                    point_invalid = True
-
-            if not point_invalid:
-                points.append(point)
-        #----------------------------------------------------------------------#
-
-        if iterations >= max_iterations:
-            self.generate_seed_points() #didn't work, try again
+        #Seeds are whole numbers inside the border (adding padding).
+        min_x = min_y = self.seed_padding
+        max_x = int(self.width - self.seed_padding) - 1
+        max_y = int(self.height - self.seed_padding) - 1
+
+        #Whole number points are always at least 1 apart anyway.
+        radius = max(self.seed_padding, 1)
+
+        #Don't even bother if they couldn't fit if they were packed perfectly.
+        max_seeds = self.max_seed_count()
+        if self.number_of_seeds > max_seeds:
+            raise Exception(f"{self.number_of_seeds} seeds can't fit with "
+                            f"{self.seed_padding} padding (at most {max_seeds})")
+
+        #Usually random points are enough (and spread out the most evenly).
+        sampler = poisson.Poisson_disk(min_x, min_y, max_x, max_y, radius,
+                                       rng = self.rng, integer = True)
+        points = sampler.throw_darts(self.number_of_seeds,
+                                     self.number_of_seeds * 30)
+
+        #If it's too crowded for that, fill the whole diagram and pick the
+        #seeds from those points (any of them are still padding apart).
+        if len(points) < self.number_of_seeds:
+            sampler = poisson.Poisson_disk(min_x, min_y, max_x, max_y, radius,
+                                           rng = self.rng, integer = True)
+            points = sampler.sample()
+            if len(points) < self.number_of_seeds:
+                raise Exception(f"only {len(points)} of "
+                                f"{self.number_of_seeds} seeds fit with "
+                                f"{self.seed_padding} padding")
+            points = self.rng.sample(points, self.number_of_seeds)
 
         self.points = points
 
+    def max_seed_count(self):
+        #The most seeds that could possibly fit with this padding.
+        width = int(self.width - self.seed_padding) - 1 - self.seed_padding
+        height = int(self.height - self.seed_padding) - 1 - self.seed_padding
+        return poisson.max_points(width, height, max(self.seed_padding, 1))
+
     def generate_seeds(self):
         self.seeds = list()
-        for point in self.points:
-            self.seeds.append(Voronoi_seed(point, self))
+        for (index, point) in enumerate(self.points):
+            self.seeds.append(Voronoi_seed(point, self, index))
+
+        #Seeds waiting for the sweepline, lowest first.
+        self.pending_seeds = sorted(self.seeds, key = lambda seed: seed.pos[1])
+        self.pending_seeds.reverse() #so the lowest can be popped off the end
 
     def generate_borderlines(self):
         self.borderlines = dict()
@@ -131,20 +211,253 @@ class Voronoi(object):
     #to find legal intersections (see valid_intersection for more on legality)
     ############################################################################
     def solve(self):
-        #Arbitrary height chosen as a stopping point
-        #(most or maybe all diagrams will be solved by that point).
-        while self.sweepline_height < self.height * 1.75:
-            self.move_sweepline(self.sweepline_step)
+        while not self.is_solved():
+            self.move_sweepline(self.next_sweepline_step())
+
+    def is_solved(self):
+        if not self.adaptive:
+            #Arbitrary height chosen as a stopping point
+            #(most or maybe all diagrams will be solved by that point).
+            return self.sweepline_height >= self.height * 1.75
+
+        #Every cell is closed once every seed has been reached and the
+        #beachline is above the top border all the way across (nothing in the
+        #diagram can change after that).
+        if len(self.pending_seeds) > 0:
+            return False
+        if len(self.live_seeds) == 0: #every seed is complete
+            return True
+        intervals = list()
+        for seed in self.live_seeds:
+            interval = seed.parabola.interval_above(self.height)
+            if interval != None:
+                intervals.append(interval)
+        x = 0
+        for (x_min, x_max) in sorted(intervals):
+            if x_min > x:
+                return False
+            x = max(x, x_max)
+        return x >= self.width
+
+    def next_sweepline_step(self):
+        if not self.adaptive:
+            return self.sweepline_step
+
+        #Stop just short of anything that's about to happen so the edges are
+        #recorded right where they end, then step just past it.
+        sweepline_height = self.sweepline_height
+        targets = list()
+        for height in self.upcoming_events():
+            if height - self.sweepline_min_step > sweepline_height:
+                targets.append(height - self.sweepline_min_step)
+            elif height > sweepline_height:
+                targets.append(height + self.sweepline_min_step)
+
+        #Seeds are only reached once the sweepline is past them. Stopping
+        #just before too keeps an edge that ends where a new arc comes in.
+        if len(self.pending_seeds) > 0:
+            height = self.pending_seeds[-1].pos[1]
+            targets.append(height - self.sweepline_min_step)
+            targets.append(height + self.sweepline_min_step)
+
+        step = self.sweepline_max_step
+        for target in targets:
+            if target > sweepline_height:
+                step = min(step, target - sweepline_height)
+        return max(step, self.sweepline_min_step)
+
+    def upcoming_events(self):
+        #Predicts the sweepline heights where the beachline changes. Every
+        #arc next to another one on the beachline counts, even outside of the
+        #border, since those are the ones that come into it later. Each arc
+        #with different seeds on either side is squeezed out when the three
+        #seeds' circle is passed.
+        events = list()
+        arcs = self.beachline_arcs()
+        for i in range(1, len(arcs) - 1):
+            (left, middle, right) = arcs[i - 1:i + 2]
+            if left is right:
+                continue
+            circle = fortune.circle_event(left.pos, middle.pos, right.pos)
+            if circle != None:
+                events.append(circle[0])
+
+        #Each breakpoint runs along the line halfway between its two seeds,
+        #so it can only cross the border where that line does.
+        for i in range(len(arcs) - 1):
+            events.extend(self.border_crossing_heights(arcs[i].pos,
+                                                       arcs[i + 1].pos))
+        return events
+
+    def beachline_arcs(self):
+        #The live seeds in the order their arcs are on the beachline, from
+        #left to right all the way across (not just inside the border). A
+        #seed can have more than one arc. Starting from the widest parabola
+        #(the one on top far to the left), the next arc is whichever parabola
+        #crosses above the current one first.
+        seeds = [seed for seed in self.live_seeds
+                 if seed.pos[1] < self.sweepline_height]
+        if len(seeds) == 0:
+            return [ ]
+
+        directrix = self.sweepline_height
+        arc = min(seeds, key = lambda seed: (seed.pos[1], seed.pos[0]))
+        arcs = [arc]
+        x = -math.inf
+        for _ in range(2 * len(seeds)): #never more arcs than that
+            next_arc = None
+            next_x = math.inf
+            for seed in seeds:
+                if seed is arc:
+                    continue
+                if seed.pos[1] == arc.pos[1] and seed.pos[0] < arc.pos[0]:
+                    continue #(only on top to the left)
+                breakpoint_x = fortune.breakpoint(arc.pos, seed.pos, directrix)
+                if x < breakpoint_x < next_x:
+                    next_arc = seed
+                    next_x = breakpoint_x
+            if next_arc == None:
+                break
+            (arc, x) = (next_arc, next_x)
+            arcs.append(arc)
+        return arcs
+
+    def border_crossing_heights(self, site1, site2):
+        #A point is on the beachline when the sweepline is as far above it as
+        #the seeds are from it. These are the sweepline heights where the
+        #breakpoint between the two seeds' arcs could be on the border.
+        heights = list()
+        middle_x = (site1[0] + site2[0]) / 2
+        middle_y = (site1[1] + site2[1]) / 2
+        dx = site1[1] - site2[1]
+        dy = site2[0] - site1[0]
+
+        crossings = list()
+        if dx != 0:
+            for x in (0, self.width):
+                crossings.append((x, middle_y + dy * (x - middle_x) / dx))
+        if dy != 0:
+            for y in (0, self.height):
+                crossings.append((middle_x + dx * (y - middle_y) / dy, y))
+        for (x, y) in crossings:
+            if 0 <= x <= self.width and 0 <= y <= self.height:
+                heights.append(y + math.hypot(x - site1[0], y - site1[1]))
+        return heights
+
+    def solve_quickly(self):
+        #Unlike solve, this doesn't move the sweepline step by step at all.
+        #The edges come from fortune.py and are put into each seed's
+        #intersections (keyed by the neighbouring seed) so that the rest of
+        #the seed methods don't know the difference.
+        solver = fortune.Fortune(self.points, self.width, self.height)
+        solver.solve()
+
+        self.mark_solved()
+        for seed in self.seeds:
+            seed.intersections = dict()
+
+        #Each point is only given to a seed once (corners of the cell are
+        #shared by two of its edges).
+        seen_points = [set() for _ in self.seeds]
+        def add_point(i, key, point):
+            if fortune.point_key(point) not in seen_points[i]:
+                seen_points[i].add(fortune.point_key(point))
+                seed = self.seeds[i]
+                if key not in seed.intersections:
+                    seed.intersections[key] = list()
+                seed.intersections[key].append(point)
+
+        for (i, j, point1, point2) in solver.clipped_edges:
+            for point in (point1, point2):
+                add_point(i, self.seeds[j], point)
+                add_point(j, self.seeds[i], point)
+
+        #Corners of the diagram go with the top or bottom border.
+        for (i, corner) in solver.corners:
+            if corner[1] == 0:
+                add_point(i, self.borderlines["bottom"], corner)
+            else:
+                add_point(i, self.borderlines["top"], corner)
+
+    def build_cells(self):
+        #Exact cells without solving (see note 8).
+        builder = cells.Cell_builder(self.points, self.width, self.height)
+        self.cell_vertices = builder.build_cells()
+
+        self.mark_solved()
+        for (seed, vertices) in zip(self.seeds, self.cell_vertices):
+            seed.cell = list(zip(vertices[0::2], vertices[1::2]))
+
+    def make_dcel(self):
+        #Cells and how they connect (see note 9). It's kept in self.dcel.
+        if self.cell_vertices == None:
+            self.build_cells()
+        self.dcel = dcel.Dcel(self.points, self.cell_vertices)
+        return self.dcel
+
+    def make_kdtree(self):
+        #For finding the cell a point is in (see note 10).
+        self.kdtree = kdtree.Kd_tree(self.points)
+        return self.kdtree
+
+    def get_seed_at_pos(self, pos, hint = None):
+        #The seed whose cell pos is in (None if there are no seeds). hint is
+        #a seed it's probably in (see kdtree.py note 3).
+        if self.kdtree == None:
+            self.make_kdtree()
+        if hint != None:
+            hint = hint.index
+        index = self.kdtree.nearest(pos, hint)
+        if index == None:
+            return None
+        return self.seeds[index]
+
+    def get_seed_indices_at(self, positions):
+        #Same as get_seed_at_pos for a batch of positions, but gives the
+        #seeds' indices (see kdtree.nearest_batch).
+        if self.kdtree == None:
+            self.make_kdtree()
+        return self.kdtree.nearest_batch(positions)
+
+    def load_cells(self, cells):
+        #Takes the cells from get_cells (in the same order as the seeds) in
+        #place of solving the diagram.
+        self.mark_solved()
+        self.cell_vertices = list()
+        for (seed, cell) in zip(self.seeds, cells):
+            seed.cell = [tuple(point) for point in cell]
+            self.cell_vertices.append(
+                    array.array("d", [xy for point in cell for xy in point]))
+
+    def get_cells(self):
+        #Each seed's cell as an angle-ordered list of tuple-points.
+        return [seed.poll_points() for seed in self.seeds]
+
+    def mark_solved(self):
+        for seed in self.seeds:
+            seed.active = True
+            seed.complete = True
+        self.pending_seeds = list()
+        self.live_seeds = list()
 
-    def solve_visually(self):
+        self.sweepline_height = self.height * 1.75 #nothing left to sweep
+        self.sweepline.y = self.sweepline_height
+
+    def solve_visually(self, time_budget = None):
         #Unlike solve, solve_visually only goes through a single iteration
         #of the sweepline step. This is useful for polling the diagram
-        #for its current state when drawing.
-        if self.sweepline_height > self.height * 1.75:
+        #for its current state when drawing. With a time_budget (seconds), it
+        #keeps stepping until that much time is used up (or it's solved), so
+        #it goes as fast as it can while still drawing every frame.
+        if self.is_solved():
             return None
 
         else:
-            self.move_sweepline(self.sweepline_step)
+            start = time.perf_counter()
+            self.move_sweepline(self.next_sweepline_step())
+            while (time_budget != None and not self.is_solved() and
+                   time.perf_counter() - start < time_budget):
+                self.move_sweepline(self.next_sweepline_step())
 
             seed_points = list()
             for seed in self.seeds:
@@ -163,13 +476,150 @@ class Voronoi(object):
         #This runs through each seed and checks for active-ness. An active seed
         #is a seed that is below the sweepline. If a seed is active, it will
         #be "adjusted" (see seed.adjust) to check for legal intersections
-        #(see valid_intersection for definition of legality). 
-        for seed in self.seeds:
-            if not seed.active and self.sweepline > seed.pos:
-                seed.activate(self.sweepline_height, self.borderlines)
+        #(see valid_intersection for definition of legality). Only live seeds
+        #(active and not complete) are adjusted.
+        self.activate_seeds()
+
+        if self.batched:
+            updated_seeds = self.test_seeds_batched()
+        else:
+            #Every parabola is moved up first so that none of the seeds are
+            #checked against a parabola that's still a step behind.
+            for seed in self.live_seeds:
+                seed.parabola.directrix = self.sweepline_height
+
+            updated_seeds = set()
+            for seed in self.live_seeds:
+                if seed.adjust(self.sweepline_height, self.live_seeds,
+                               self.borderlines):
+                    updated_seeds.add(seed)
+
+        self.retire_complete_seeds(updated_seeds)
+        self.live_seed_counts.append(len(self.live_seeds))
+
+    def activate_seeds(self):
+        activated = False
+        while (len(self.pending_seeds) > 0 and
+               self.sweepline > self.pending_seeds[-1].pos):
+            seed = self.pending_seeds.pop()
+            seed.activate(self.sweepline_height, self.borderlines)
+            activated = True
+
+        if activated: #live seeds stay in the same order as seeds
+            self.live_seeds = [seed for seed in self.seeds
+                               if seed.active and not seed.complete]
+
+    def retire_complete_seeds(self, updated_seeds):
+        #A seed that found a legal intersection this step is still on the
+        #beachline. Any other seed (that's found something before) might have
+        #been squeezed out of it, which means its cell is closed for good.
+        retired = False
+        for seed in self.live_seeds:
+            if seed in updated_seeds or not seed.has_intersections():
+                continue
+            others = [other.parabola for other in self.live_seeds
+                      if other is not seed and not other.complete]
+            if seed.parabola.is_covered(others, 0, self.width):
+                seed.complete = True
+                retired = True
+
+        if retired:
+            self.live_seeds = [seed for seed in self.live_seeds
+                               if not seed.complete]
+
+    def test_seeds_batched(self):
+        #Same as test_seeds, except all of the active seeds are adjusted at
+        #once. Every parabola's (p, h, k) goes into arrays (see
+        #parabola_batch.py), every pair is solved at once, and every candidate
+        #intersection is checked for legality at once. Only the legal ones are
+        #put into the seeds' intersections (same as seed.adjust does).
+        #Returns the set of seeds that got a legal intersection.
+        seeds = self.live_seeds
+        if len(seeds) == 0:
+            return set()
+
+        for seed in seeds:
+            seed.parabola.directrix = self.sweepline_height
+
+        parabolas = parabola_batch.Parabola_batch([seed.pos for seed in seeds],
+                                                  self.sweepline_height)
+
+        numpy = parabola_batch.numpy
+
+        #Every candidate is gathered up first so that they're all tested for
+        #legality at once. Each one remembers its seed, the other seed or
+        #border it came from, and which root it is (x1 = 0, x2 = 1).
+        xs = list()
+        ys = list()
+        seed_indices = list()
+        other_keys = list() #index of other seed, or -1 - border index
+        roots = list()
+        def gather(i, other, x1, y1, x2, y2):
+            two_roots = x1 != x2
+            xs.extend([x1, x2[two_roots]])
+            ys.extend([y1, y2[two_roots]])
+            seed_indices.extend([i, i[two_roots]])
+            other_keys.extend([other, other[two_roots]])
+            roots.extend([numpy.zeros(len(x1), dtype = int),
+                          numpy.ones(int(two_roots.sum()), dtype = int)])
+
+        #Testing borders. The left and right borders are vertical, so each
+        #parabola only meets them once (right on the border).
+        #----------------------------------------------------------------------#
+        borders = [self.borderlines["top"], self.borderlines["bottom"],
+                   self.borderlines["left"], self.borderlines["right"]]
+        for (b, line) in enumerate(borders):
+            if line.slope == None:
+                (i, x1, y1, x2, y2) = parabolas.vertical_line_intersections(
+                                                                        line.x)
+            else:
+                (i, x1, y1, x2, y2) = parabolas.horizontal_line_intersections(
+                                                                        line.y)
+            gather(i, numpy.full(len(i), -1 - b), x1, y1, x2, y2)
+        #----------------------------------------------------------------------#
 
-            if not seed.complete and seed.active:
-                seed.adjust(self.sweepline_height, self.seeds, self.borderlines)
+        #Testing other seeds. Each pair is only solved once, the other seed
+        #gets the same points with the roots swapped (its quadratic is the
+        #negative of this one).
+        #----------------------------------------------------------------------#
+        (i, j, x1, y1, x2, y2) = parabolas.pairwise_intersections()
+        gather(i, j, x1, y1, x2, y2)
+        #----------------------------------------------------------------------#
+
+        x = numpy.concatenate(xs)
+        y = numpy.concatenate(ys)
+        valid = numpy.nonzero(self.valid_intersections(parabolas, x, y))[0]
+
+        points = zip(x[valid].tolist(), y[valid].tolist(),
+                     numpy.concatenate(seed_indices)[valid].tolist(),
+                     numpy.concatenate(other_keys)[valid].tolist(),
+                     numpy.concatenate(roots)[valid].tolist())
+        updated_seeds = set()
+        for (x, y, i, other, root) in points:
+            seed = seeds[i]
+            intersection = (x, y)
+            updated_seeds.add(seed)
+            if other < 0:
+                seed.intersections[borders[-1 - other]][root] = intersection
+            else:
+                other_seed = seeds[other]
+                if other_seed not in seed.intersections:
+                    seed.intersections[other_seed] = [None, None]
+                if seed not in other_seed.intersections:
+                    other_seed.intersections[seed] = [None, None]
+                seed.intersections[other_seed][root] = intersection
+                other_seed.intersections[seed][1 - root] = intersection
+                updated_seeds.add(other_seed)
+        return updated_seeds
+
+    def valid_intersections(self, parabolas, x, y):
+        #Same as valid_intersection for a whole array of points.
+        in_bounds = ((x >= 0) & (x <= self.width) &
+                     (y >= 0) & (y <= self.height))
+        valid = in_bounds.copy()
+        valid[in_bounds] = ~parabolas.points_under(x[in_bounds], y[in_bounds],
+                                                   self.width)
+        return valid
 
     def valid_intersection(self, intersection):
         #A valid intersection is one that is NOT beneath a given parabola.
@@ -182,23 +632,23 @@ class Voronoi(object):
                 self.intersection_is_edge(intersection))
 
     def intersection_in_bounds(self, intersection):
-        return (self.borderlines["left"  ] < intersection and
-                self.borderlines["right" ] > intersection and
-                self.borderlines["top"   ] > intersection and
-                self.borderlines["bottom"] < intersection)
+        #Points right on the border count (that's where the border ones are).
+        (x, y) = intersection
+        return 0 <= x <= self.width and 0 <= y <= self.height
 
     def intersection_is_edge(self, intersection):
         valid = True
-        for seed in self.seeds:
-            if seed.active and seed.parabola > intersection:
+        for seed in self.live_seeds:
+            if seed.parabola > intersection:
                 valid = False
                 break
         return valid
 
 class Voronoi_seed(object):
-    def __init__(self, pos, parent):
+    def __init__(self, pos, parent, index = None):
         self.pos = pos
         self.parent = parent
+        self.index = index #in parent.seeds (and parent.points)
 
         self.active = False
         self.complete = False
@@ -206,6 +656,7 @@ class Voronoi_seed(object):
         self.parabola = None
         self.intersections = dict()
         self.border_intersections = dict()
+        self.cell = None #only given when loaded (see parent.load_cells)
 
     def __lt__(self, sweepline):
         #This is used for deciding if the seed is active or not
@@ -227,7 +678,9 @@ class Voronoi_seed(object):
             self.intersections[line] = [None, None]
 
     def adjust(self, sweepline_height, other_seeds, borderlines):
+        #Returns True if any legal intersection was found.
         self.parabola.directrix = sweepline_height
+        updated = False
 
         #Testing borders.
         #----------------------------------------------------------------------#
@@ -239,6 +692,7 @@ class Voronoi_seed(object):
             for (i, intersection) in enumerate(intersections):
                 if self.parent.valid_intersection(intersection):
                     self.intersections[line][i] = intersection
+                    updated = True
         #----------------------------------------------------------------------#
 
         #Testing other seeds.
@@ -253,7 +707,17 @@ class Voronoi_seed(object):
                 for (i, intersection) in enumerate(intersections):
                     if self.parent.valid_intersection(intersection):
                         self.intersections[seed][i] = intersection
+                        updated = True
         #----------------------------------------------------------------------#
+
+        return updated
+
+    def has_intersections(self):
+        for key in self.intersections:
+            for intersection in self.intersections[key]:
+                if intersection != None:
+                    return True
+        return False
     #==========================================================================#
 
     #Getting the points (intersections) below. One is for a list of tuple-points
@@ -262,6 +726,9 @@ class Voronoi_seed(object):
     def poll_points(self):
         #Points will be a list of tuple-points:
         #                                    [(x1, y1), (x2, y1), ..., (xn, yn)]
+        if self.cell != None: #already ordered
+            return list(self.cell)
+
         points = list()
         for seed in self.intersections:
             for intersection in self.intersections[seed]:
@@ -311,15 +778,10 @@ class Voronoi_seed(object):
             dx = x2 - x1
             dy = y2 - y1
 
-            #A vector is "drawn" from the seed's pos to the intersection point
-            #and the angle from 0*pi  and the length of the vector is taken
-            #for defining the polygon (see polygon.py)
-            v = shapes.Vector(self.pos, (dx, dy))
-            angle = v.angle
-            width = v.magnitude
-
-            angles.append(angle)
-            widths.append(width)
+            #The angle from 0*pi and the distance from the seed's pos to the
+            #intersection point define the polygon (see polygon.py).
+            angles.append(math.atan2(dy, dx))
+            widths.append(math.hypot(dx, dy))
 
         polygon = shapes.Simple_polygon(self.pos, angles, widths)
         return polygon
@@ -330,26 +792,8 @@ def isnear(point1, point2, nearness):
 
 def ordered(pos, points):
     #Takes a list of tuple-points [(x, y), ...]
-    #and returns an angle-ordered list
-    #(draws vectors to each point from pos and nabs the angle).
-    #Note that angles more than 2*pi will not appear because of the nature of
-    #how vector.angle is computed.
-    ordered_points_dict = dict()
-    angles = list()
+    #and returns an angle-ordered list (angle from pos to each point).
+    #Points at the same angle are all kept, in the order they were given.
     (x1, y1) = pos
-    for point in points:
-        (x2, y2) = point
-        dx = x2 - x1
-        dy = y2 - y1
-
-        v = shapes.Vector(pos, (dx, dy))
-        angle = v.angle
-
-        ordered_points_dict[angle] = point
-        angles.append(angle)
-
-    ordered_points = list()
-    for angle in sorted(angles):
-        ordered_points.append(ordered_points_dict[angle])
-
-    return ordered_points
+    return sorted(points,
+                  key = lambda point: math.atan2(point[1] - y1, point[0] - x1))